@@ -0,0 +1,161 @@
+import argparse
+import datetime
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Synthetic stand-ins for the datasets the services read from ../DATA, written under
+# <root>/DATA with the same paths and layouts. The same seed and scale always give the
+# same files, so benchmark results are comparable across commits.
+#
+#   python benchmarks/generate_data.py /tmp/bench --scale 1
+#
+# <root>/benchmark_meta.json records the plates, countries and dates the suite queries.
+
+PARKING_DIR = os.path.join('DATA', 'data_export')
+PARKING_FILE = os.path.join(PARKING_DIR, 'Parking_Violations_Issued_2022.csv')
+VIOLATION_CODES_FILE = os.path.join(PARKING_DIR, 'ParkingViolationCodes_January2020.csv')
+AIRNOW_DIR = os.path.join('DATA', 'AirNow fires', 'fire-2020-full-data', 'data')
+POPULATION_FILE = os.path.join('DATA', 'API_SP.POP.TOTL_DS2_en_csv_v2_3401680',
+                               'API_SP.POP.TOTL_DS2_en_csv_v2_3401680.csv')
+
+# Rows at --scale 1
+PARKING_ROWS = 500000
+AIRNOW_SITES = 200
+AIRNOW_DAYS = 7
+POPULATION_COUNTRIES = 266
+
+VIOLATION_CODES = 99
+STATES = ['NY', 'NJ', 'PA', 'CT', 'FL', 'MA', 'TX', 'CA', 'VA', 'MD']
+STREETS = ['Broadway', '5th Ave', 'Lexington Ave', 'W 42nd St', 'Atlantic Ave', 'Queens Blvd', 'Grand Concourse']
+PARAMETERS = ['PM2.5', 'OZONE', 'PM10']
+AGENCIES = ['California Air Resources Board', 'US Forest Service', 'EPA']
+
+def plate_numbers(rng, count):
+    letters = rng.integers(0, 26, (count, 3)) + ord('A')
+    digits = rng.integers(0, 10000, count)
+    return np.array([f"{''.join(map(chr, row))}{d:04d}" for row, d in zip(letters, digits)])
+
+def write_violation_codes(root):
+    codes = np.arange(1, VIOLATION_CODES + 1)
+    base = (codes % 9 + 1) * 15
+    pd.DataFrame({
+        'VIOLATION CODE': codes,
+        'VIOLATION DESCRIPTION': [f"VIOLATION {code:02d}" for code in codes],
+        "Manhattan  96th St. & below\n(Fine Amount $)": base + 20,
+        "All Other Areas\n(Fine Amount $)": base,
+    }).to_csv(os.path.join(root, VIOLATION_CODES_FILE), index=False)
+
+# Plates are drawn from a Zipf-like distribution so a few plates have many violations,
+# like the real data; the most frequent ones are recorded for the suite to query
+def write_parking(root, rows, rng):
+    plates = plate_numbers(rng, max(rows // 20, 10))
+    weights = 1 / np.arange(1, len(plates) + 1)
+    picks = rng.choice(len(plates), rows, p=weights / weights.sum())
+    codes = rng.integers(1, VIOLATION_CODES + 6, rows)
+    issue_dates = pd.Timestamp('2021-07-01') + pd.to_timedelta(rng.integers(0, 365, rows), unit='D')
+
+    pd.DataFrame({
+        'Summons Number': np.arange(1000000000, 1000000000 + rows),
+        'Plate ID': plates[picks],
+        'Registration State': np.array(STATES)[rng.integers(0, len(STATES), rows)],
+        'Plate Type': 'PAS',
+        'Issue Date': issue_dates.strftime('%m/%d/%Y'),
+        'Violation Code': codes,
+        'Vehicle Make': 'TOYOT',
+        'Street Name': np.array(STREETS)[rng.integers(0, len(STREETS), rows)],
+        'Violation Description': [f"VIOLATION {code:02d}" for code in codes],
+    }).to_csv(os.path.join(root, PARKING_FILE), index=False)
+    return [str(plate) for plate in plates[:20]]
+
+# One folder and one headerless CSV per day with hourly readings for every site
+def write_airnow(root, sites, days, rng, start=datetime.date(2020, 8, 14)):
+    latitudes = rng.uniform(32.5, 42.0, sites).round(4)
+    longitudes = rng.uniform(-124.4, -114.1, sites).round(4)
+    site_names = np.array([f"Site {i:04d}" for i in range(sites)])
+    site_agencies = np.array(AGENCIES)[rng.integers(0, len(AGENCIES), sites)]
+    site_parameters = np.array(PARAMETERS)[rng.integers(0, len(PARAMETERS), sites)]
+
+    dates = []
+    for day in range(days):
+        date = (start + datetime.timedelta(days=day)).strftime('%Y%m%d')
+        dates.append(date)
+        site = np.tile(np.arange(sites), 24)
+        hour = np.repeat(np.arange(24), sites)
+        concentration = rng.gamma(2.0, 15.0, len(site)).round(1)
+        aqi = np.minimum(concentration * 2, 500).astype(int)
+        aqi[rng.random(len(site)) < 0.02] = -999
+
+        folder = os.path.join(root, AIRNOW_DIR, date)
+        os.makedirs(folder, exist_ok=True)
+        pd.DataFrame({
+            'Latitude': latitudes[site],
+            'Longitude': longitudes[site],
+            'Time': [f"{date[:4]}-{date[4:6]}-{date[6:]}T{h:02d}:00" for h in hour],
+            'Parameter': site_parameters[site],
+            'Concentration': concentration,
+            'Unit': 'UG/M3',
+            'Raw-Concentration': concentration,
+            'AQI': aqi,
+            'Category': np.clip(aqi // 50 + 1, 1, 6),
+            'Site-name': site_names[site],
+            'Site-agency': site_agencies[site],
+            'AQS-ID': [f"06{s:07d}" for s in site],
+            'Full_AQS-ID': [f"84006{s:07d}" for s in site],
+        }).to_csv(os.path.join(folder, date + '.csv'), index=False, header=False)
+    return dates, [str(name) for name in site_names[:5]]
+
+# World Bank layout: one row per country, one column per year, with scattered missing values
+def write_population(root, countries, rng):
+    years = [str(year) for year in range(1960, 2022)]
+    growth = rng.normal(0.015, 0.01, (countries, len(years)))
+    start = rng.uniform(5e4, 5e7, (countries, 1))
+    matrix = (start * np.cumprod(1 + growth, axis=1)).round()
+    matrix[rng.random((countries, len(years))) < 0.03] = np.nan
+
+    names = [f"Country {i:03d}" for i in range(countries)]
+    codes = [f"{chr(65 + i // 676 % 26)}{chr(65 + i // 26 % 26)}{chr(65 + i % 26)}" for i in range(countries)]
+    df = pd.DataFrame(matrix, columns=years)
+    df.insert(0, 'Indicator Code', 'SP.POP.TOTL')
+    df.insert(0, 'Indicator Name', 'Population, total')
+    df.insert(0, 'Country Code', codes)
+    df.insert(0, 'Country Name', names)
+    df.to_csv(os.path.join(root, POPULATION_FILE), index=False)
+    return names[:20], codes[:5]
+
+def generate(root, scale=1.0, seed=0):
+    rng = np.random.default_rng(seed)
+    for path in (PARKING_FILE, POPULATION_FILE):
+        os.makedirs(os.path.join(root, os.path.dirname(path)), exist_ok=True)
+
+    write_violation_codes(root)
+    plates = write_parking(root, max(int(PARKING_ROWS * scale), 100), rng)
+    dates, sites = write_airnow(root, max(int(AIRNOW_SITES * scale), 5), AIRNOW_DAYS, rng)
+    countries, codes = write_population(root, POPULATION_COUNTRIES, rng)
+
+    meta = {
+        "scale": scale,
+        "seed": seed,
+        "plates": plates,
+        "airnow_dates": dates,
+        "airnow_sites": sites,
+        "countries": countries,
+        "country_codes": codes,
+    }
+    with open(os.path.join(root, 'benchmark_meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic datasets for the benchmark suite")
+    parser.add_argument('root', help="directory to create DATA/ in")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help=f"1.0 = {PARKING_ROWS} parking rows and {AIRNOW_SITES} AirNow sites")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    generate(args.root, args.scale, args.seed)
+
+if __name__ == '__main__':
+    main()
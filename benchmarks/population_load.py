@@ -0,0 +1,132 @@
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from flask import Flask, jsonify
+from werkzeug.serving import make_server
+
+# Load benchmark for the population service: the current inline request handling versus
+# the previous design, where every lookup was submitted to a 4-worker ThreadPoolExecutor
+# and the request thread blocked on future.result().
+#
+#   python benchmarks/population_load.py --clients 16 --duration 10
+
+HIGH_PERFORMANCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'high_performance')
+
+def load_service():
+    # The service reads its CSV relative to its own directory
+    sys.path.insert(0, HIGH_PERFORMANCE_DIR)
+    os.chdir(HIGH_PERFORMANCE_DIR)
+    import population_multithreaded
+    population_multithreaded.start_loading()
+    with population_multithreaded.app.test_client() as client:
+        while client.get('/ready').status_code == 503:
+            time.sleep(0.05)
+    return population_multithreaded
+
+# Same routes and lookups, but every request hops through a 4-worker executor
+def executor_app(service):
+    app = Flask('population_executor')
+    executor = ThreadPoolExecutor(max_workers=4)
+
+    def hop(function, *args):
+        start_time = time.time()
+        result = executor.submit(function, *args).result()
+        return jsonify({"result": result, "processing_time": time.time() - start_time})
+
+    app.add_url_rule('/population/<country>/<year>', 'population',
+                     lambda country, year: hop(service.get_population_data, country, year))
+    app.add_url_rule('/population/cumulative/country/<country>', 'country',
+                     lambda country: hop(service.get_cumulative_country_data, country))
+    app.add_url_rule('/population/cumulative/year/<year>', 'year',
+                     lambda year: hop(service.get_cumulative_year_data, year))
+    return app
+
+def request_paths(service, count, seed):
+    rng = random.Random(seed)
+    countries = [name for name in service.country_names if name != 'nan']
+    paths = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.6:
+            paths.append(f"/population/{rng.choice(countries)}/{rng.choice(service.years)}")
+        elif kind < 0.9:
+            paths.append(f"/population/cumulative/country/{rng.choice(countries)}")
+        else:
+            paths.append(f"/population/cumulative/year/{rng.choice(service.years)}")
+    return [urllib.parse.quote(path) for path in paths]
+
+def run_load(app, paths, clients, duration):
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    latencies = [[] for _ in range(clients)]
+    deadline = time.perf_counter() + duration
+
+    def client(i):
+        n = i
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            with urllib.request.urlopen(base_url + paths[n % len(paths)]) as response:
+                response.read()
+            latencies[i].append(time.perf_counter() - start)
+            n += clients
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    all_latencies = np.array([latency for client_latencies in latencies for latency in client_latencies])
+    return {
+        "requests": int(len(all_latencies)),
+        "throughput_rps": len(all_latencies) / elapsed,
+        "p50_ms": float(np.percentile(all_latencies, 50) * 1000),
+        "p99_ms": float(np.percentile(all_latencies, 99) * 1000),
+        "mean_ms": float(all_latencies.mean() * 1000),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Population service load benchmark: inline vs executor hop")
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds per design")
+    parser.add_argument('--warmup', type=float, default=2.0, help="seconds of unmeasured load per design")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+    json_path = os.path.abspath(args.json) if args.json else None
+
+    service = load_service()
+    paths = request_paths(service, 10000, args.seed)
+    designs = {"inline": service.app, "executor": executor_app(service)}
+
+    results = {}
+    for name, app in designs.items():
+        run_load(app, paths, args.clients, args.warmup)
+        results[name] = run_load(app, paths, args.clients, args.duration)
+
+    print(f"{'design':<10}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, result in results.items():
+        print(f"{name:<10}{result['requests']:>10}{result['throughput_rps']:>10.1f}"
+              f"{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}")
+
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump({"clients": args.clients, "duration": args.duration, "results": results}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
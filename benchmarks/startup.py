@@ -0,0 +1,96 @@
+import argparse
+import glob
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+# Boot-to-ready benchmark for the high performance services: each service is started in
+# a fresh process and /ready is polled until it answers 200.
+#
+#   python benchmarks/startup.py --runs 5
+#   python benchmarks/startup.py --runs 5 --clear-numba-cache   # include JIT compilation
+
+HIGH_PERFORMANCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'high_performance')
+SERVICES = ['parking_violations', 'airnow_fires', 'population_multithreaded']
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def clear_numba_cache():
+    for path in glob.glob(os.path.join(HIGH_PERFORMANCE_DIR, '__pycache__', '*.nb[ic]')):
+        os.remove(path)
+
+def measure(service, timeout):
+    port = free_port()
+    code = (f"import {service} as service; service.start_loading(); "
+            f"service.app.run(port={port}, debug=False, use_reloader=False)")
+    url = f"http://127.0.0.1:{port}/ready"
+
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-c', code], cwd=HIGH_PERFORMANCE_DIR,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    listening = None
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(url) as response:
+                    body = json.load(response)
+                return {
+                    "boot_to_listen_s": (listening or time.perf_counter()) - started,
+                    "boot_to_ready_s": time.perf_counter() - started,
+                    "reported_load_s": body.get("boot_to_ready_seconds"),
+                }
+            except urllib.error.HTTPError as e:
+                listening = listening or time.perf_counter()
+                if e.code != 503:
+                    raise RuntimeError(f"{service} failed to load: {e.read().decode()}")
+            except (urllib.error.URLError, ConnectionError):
+                if process.poll() is not None:
+                    raise RuntimeError(f"{service} exited with code {process.returncode}")
+            time.sleep(0.02)
+        raise RuntimeError(f"{service} was not ready after {timeout} seconds")
+    finally:
+        process.terminate()
+        process.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="Boot-to-ready benchmark for the high performance services")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=300.0)
+    parser.add_argument('--services', nargs='+', default=SERVICES, choices=SERVICES)
+    parser.add_argument('--clear-numba-cache', action='store_true',
+                        help="delete cached Numba kernels before every run to measure cold starts")
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    for service in args.services:
+        runs = []
+        for _ in range(args.runs):
+            if args.clear_numba_cache:
+                clear_numba_cache()
+            runs.append(measure(service, args.timeout))
+        results[service] = {
+            "runs": runs,
+            "median_boot_to_listen_s": statistics.median(run["boot_to_listen_s"] for run in runs),
+            "median_boot_to_ready_s": statistics.median(run["boot_to_ready_s"] for run in runs),
+        }
+
+    print(f"{'service':<28}{'listen s':>10}{'ready s':>10}")
+    for service, result in results.items():
+        print(f"{service:<28}{result['median_boot_to_listen_s']:>10.3f}{result['median_boot_to_ready_s']:>10.3f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
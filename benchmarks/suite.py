@@ -0,0 +1,221 @@
+import argparse
+import importlib
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import urllib.parse
+
+import numpy as np
+
+from generate_data import AIRNOW_DIR, generate
+
+# Endpoint benchmark: the first_iteration and high_performance versions of each service
+# answer the same requests through Flask's test client, against synthetic data generated
+# into <root>/DATA (see generate_data.py). Every case gets unmeasured warmup requests,
+# then `--repeat` timed ones; results are written as JSON keyed by case and variant so
+# runs from different commits can be diffed or passed to --compare.
+#
+#   python benchmarks/suite.py /tmp/bench --scale 0.2 --json results.json
+#   python benchmarks/suite.py /tmp/bench --json new.json --compare results.json
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+VARIANTS = ['first_iteration', 'high_performance']
+SERVICES = {
+    'parking': {'first_iteration': 'parking_violations', 'high_performance': 'parking_violations'},
+    'airnow': {'first_iteration': 'airnow_fires', 'high_performance': 'airnow_fires'},
+    'population': {'first_iteration': 'population', 'high_performance': 'population_multithreaded'},
+}
+
+def quote(*segments):
+    return '/' + '/'.join(urllib.parse.quote(str(segment)) for segment in segments)
+
+# (service, path, variants) for every benchmarked request; endpoints that only exist in
+# high_performance are measured on their own
+def benchmark_cases(meta):
+    plate, country = meta["plates"][0], meta["countries"][0]
+    date_range = urllib.parse.urlencode({"start_date": meta["airnow_dates"][0], "end_date": meta["airnow_dates"][-1]})
+    batch = urllib.parse.urlencode([("plate_number", plate) for plate in meta["plates"][:10]])
+    bulk = urllib.parse.urlencode([("country", country) for country in meta["countries"]] +
+                                  [("year", "1990"), ("year", "2000"), ("year", "2010")])
+    return [
+        ('parking', quote('search') + f'?plate_number={plate}', VARIANTS),
+        ('parking', quote('search', 'batch') + f'?{batch}', ['high_performance']),
+        ('parking', quote('search', 'batch') + f'?{batch}&format=columns', ['high_performance']),
+        ('airnow', quote('process_batch_csv') + f'?{date_range}', VARIANTS),
+        ('airnow', quote('aqi', 'daily') + f'?{date_range}', ['high_performance']),
+        ('population', quote('population', country, '2000'), VARIANTS),
+        ('population', quote('population', 'cumulative', 'country', country), VARIANTS),
+        ('population', quote('population', 'cumulative', 'year', '2000'), VARIANTS),
+        ('population', quote('population', 'range', country, '1990', '2010'), ['high_performance']),
+        ('population', quote('population', 'bulk') + f'?{bulk}', ['high_performance']),
+    ]
+
+# first_iteration modules share names with high_performance ones, so they are loaded
+# under a prefixed name; high_performance modules keep their own names because they
+# import their siblings and hand functions to process pools by module name
+def load_service(variant, module_name):
+    if variant == 'first_iteration':
+        path = os.path.join(REPO_DIR, 'first_iteration', module_name + '.py')
+        spec = importlib.util.spec_from_file_location('first_iteration_' + module_name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    high_performance_dir = os.path.join(REPO_DIR, 'high_performance')
+    if high_performance_dir not in sys.path:
+        sys.path.insert(0, high_performance_dir)
+    module = importlib.import_module(module_name)
+    module.start_loading()
+    with module.app.test_client() as client:
+        while client.get('/ready').status_code == 503:
+            time.sleep(0.05)
+    return module
+
+# Build the parking columnar store and fee aggregates, as `parking_violations.py ingest`
+# does, unless a fresh store is already on disk
+def ingest_parking(service):
+    if service.get_column_store(service.PARKING_FILE) is None:
+        service.build_column_store(service.PARKING_FILE, service.columns)
+    store = service.get_column_store(service.PARKING_FILE)
+    service.get_fee_aggregates(service.PARKING_FILE, store, service.fee_tables, service.fee_tables_signature)
+
+def percentiles(latencies):
+    ms = np.array(latencies) * 1000
+    return {
+        "n": len(ms),
+        "mean_ms": float(ms.mean()),
+        "min_ms": float(ms.min()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p90_ms": float(np.percentile(ms, 90)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+    }
+
+# high_performance AirNow writes per-file summaries and rollups next to the CSVs. They
+# would otherwise carry over between requests and from one variant to the next, so
+# they are deleted before every request unless --keep-sidecars is set.
+SIDECAR_SUFFIXES = ('.summary.json', '.rollup.pkl')
+
+def remove_sidecars(data_dir):
+    for dirpath, dirnames, filenames in os.walk(data_dir):
+        for filename in filenames:
+            if filename.endswith(SIDECAR_SUFFIXES):
+                os.remove(os.path.join(dirpath, filename))
+
+# The high_performance services cache responses; the cache is cleared before each timed
+# request unless keep_cache is set, so the numbers measure the computation
+def measure(service, path, warmup, repeat, keep_cache, sidecar_dir=None):
+    result_cache = getattr(service, 'result_cache', None)
+    latencies = []
+    with service.app.test_client() as client:
+        for i in range(warmup + repeat):
+            if result_cache is not None and not keep_cache:
+                result_cache.clear()
+            if sidecar_dir is not None:
+                remove_sidecars(sidecar_dir)
+            start = time.perf_counter()
+            response = client.get(path)
+            elapsed = time.perf_counter() - start
+            if response.status_code != 200:
+                raise RuntimeError(f"{path} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+            if i >= warmup:
+                latencies.append(elapsed)
+    return percentiles(latencies)
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_comparison(results, previous):
+    print(f"\n{'case':<70}{'variant':>18}{'old p50':>10}{'new p50':>10}{'ratio':>8}")
+    for case, variants in results.items():
+        for variant, stats in variants.items():
+            old = previous.get(case, {}).get(variant)
+            if old:
+                print(f"{case[:70]:<70}{variant:>18}{old['p50_ms']:>10.2f}{stats['p50_ms']:>10.2f}"
+                      f"{stats['p50_ms'] / old['p50_ms']:>8.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="first_iteration vs high_performance endpoint benchmark")
+    parser.add_argument('root', help="directory holding (or to generate) the synthetic DATA/")
+    parser.add_argument('--scale', type=float, default=1.0, help="dataset scale when generating")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--regenerate', action='store_true', help="rewrite the data even if it exists")
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--services', nargs='+', default=list(SERVICES), choices=list(SERVICES))
+    parser.add_argument('--variants', nargs='+', default=VARIANTS, choices=VARIANTS)
+    parser.add_argument('--keep-cache', action='store_true', help="let high_performance serve repeats from its result cache")
+    parser.add_argument('--keep-sidecars', action='store_true',
+                        help="let high_performance AirNow reuse its per-file summaries and rollups")
+    parser.add_argument('--no-ingest', action='store_true', help="do not build the parking columnar store")
+    parser.add_argument('--json', help="write the results to this file")
+    parser.add_argument('--compare', help="earlier results file to compare p50 latencies against")
+    args = parser.parse_args()
+
+    root = os.path.abspath(args.root)
+    json_path = os.path.abspath(args.json) if args.json else None
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+
+    meta_path = os.path.join(root, 'benchmark_meta.json')
+    if args.regenerate or not os.path.exists(meta_path):
+        meta = generate(root, args.scale, args.seed)
+    else:
+        with open(meta_path) as f:
+            meta = json.load(f)
+
+    # The services open ../DATA relative to the working directory
+    work_dir = os.path.join(root, 'work')
+    os.makedirs(work_dir, exist_ok=True)
+    os.chdir(work_dir)
+
+    results = {}
+    for service_name in args.services:
+        sidecar_dir = os.path.join(root, AIRNOW_DIR) if service_name == 'airnow' and not args.keep_sidecars else None
+        for variant in args.variants:
+            if sidecar_dir is not None:
+                remove_sidecars(sidecar_dir)
+            service = load_service(variant, SERVICES[service_name][variant])
+            if service_name == 'parking' and variant == 'high_performance' and not args.no_ingest:
+                ingest_parking(service)
+            for case_service, path, variants in benchmark_cases(meta):
+                if case_service == service_name and variant in variants:
+                    stats = measure(service, path, args.warmup, args.repeat, args.keep_cache, sidecar_dir)
+                    results.setdefault(f"{service_name} {path}", {})[variant] = stats
+
+    print(f"{'case':<70}{'variant':>18}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+    for case, variants in results.items():
+        for variant, stats in variants.items():
+            print(f"{case[:70]:<70}{variant:>18}{stats['p50_ms']:>10.2f}{stats['p90_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+
+    if compare_path:
+        with open(compare_path) as f:
+            print_comparison(results, json.load(f)["results"])
+
+    if json_path:
+        report = {
+            "meta": {
+                **meta,
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "warmup": args.warmup,
+                "repeat": args.repeat,
+                "keep_cache": args.keep_cache,
+                "keep_sidecars": args.keep_sidecars,
+                "ingest": not args.no_ingest,
+            },
+            "results": results,
+        }
+        with open(json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
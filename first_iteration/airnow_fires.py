@@ -1,11 +1,13 @@
 import os
+import json
 import pandas as pd
+from collections import Counter
 from flask import Flask, request, jsonify
 import time
 
 app = Flask(__name__)
 
-DATA_DIR = '../DATA\AirNow fires/fire-2020-full-data/data' 
+DATA_DIR = os.path.join('..', 'DATA', 'AirNow fires', 'fire-2020-full-data', 'data')
 EXPORT_DIR = '../../'
 
 #get CSV files for a specific date range
@@ -39,6 +41,107 @@ def get_csv_files_for_exact_date(date):
 
     return csv_files
 
+expected_headers = [
+    'Latitude', 'Longitude', 'Time', 'Parameter', 'Concentration', 
+    'Unit', 'Raw-Concentration', 'AQI', 'Category', 'Site-name', 
+    'Site-agency', 'AQS-ID', 'Full_AQS-ID'
+]
+
+class ColumnMismatchError(Exception):
+    pass
+
+#AQI sum/count and frequency counters for one DataFrame
+def summarize_dataframe(result_df):
+    site_name_freq = {}
+    site_agency_freq = {}
+    parameter_freq = {}
+
+    total_aqi = 0.0
+    count_aqi = 0
+
+    for index, row in result_df.iterrows():
+        aqi = row['AQI']
+        site_name = row['Site-name']
+        site_agency = row['Site-agency']
+        parameter = row['Parameter']
+
+        if pd.notna(aqi) and aqi != -999:
+            total_aqi += aqi
+            count_aqi += 1
+
+        if site_name in site_name_freq:
+            site_name_freq[site_name] += 1
+        else:
+            site_name_freq[site_name] = 1
+
+        if site_agency in site_agency_freq:
+            site_agency_freq[site_agency] += 1
+        else:
+            site_agency_freq[site_agency] = 1
+
+        if parameter in parameter_freq:
+            parameter_freq[parameter] += 1
+        else:
+            parameter_freq[parameter] = 1
+
+    return {
+        "aqi_sum": float(total_aqi),
+        "aqi_count": count_aqi,
+        "site_name_frequency": site_name_freq,
+        "site_agency_frequency": site_agency_freq,
+        "parameter_frequency": parameter_freq
+    }
+
+def summary_path_for(file):
+    return file + '.summary.json'
+
+#per-day summary, computed once and reused until the CSV's size or mtime changes
+def summarize_file(file):
+    stat = os.stat(file)
+    summary_path = summary_path_for(file)
+    if os.path.exists(summary_path):
+        with open(summary_path) as f:
+            summary = json.load(f)
+        if summary["size"] == stat.st_size and summary["mtime_ns"] == stat.st_mtime_ns:
+            return summary
+
+    df = pd.read_csv(file, header=None)
+    if len(df.columns) != len(expected_headers):
+        raise ColumnMismatchError(f"Column length mismatch in file {file}. Expected {len(expected_headers)} columns, found {len(df.columns)} columns.")
+    df.columns = expected_headers
+
+    df['AQI'] = pd.to_numeric(df['AQI'], errors='coerce')
+    df['Site-name'] = df['Site-name'].astype(str)
+    df['Site-agency'] = df['Site-agency'].astype(str)
+    df['Parameter'] = df['Parameter'].astype(str)
+
+    summary = summarize_dataframe(df[['AQI', 'Site-name', 'Site-agency', 'Parameter']])
+    summary["size"] = stat.st_size
+    summary["mtime_ns"] = stat.st_mtime_ns
+
+    tmp_path = summary_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(summary, f)
+    os.replace(tmp_path, summary_path)
+    return summary
+
+#merge per-day summaries into one
+def merge_summaries(summaries):
+    merged = {
+        "aqi_sum": 0.0,
+        "aqi_count": 0,
+        "site_name_frequency": Counter(),
+        "site_agency_frequency": Counter(),
+        "parameter_frequency": Counter()
+    }
+    for summary in summaries:
+        merged["aqi_sum"] += summary["aqi_sum"]
+        merged["aqi_count"] += summary["aqi_count"]
+        merged["site_name_frequency"].update(summary["site_name_frequency"])
+        merged["site_agency_frequency"].update(summary["site_agency_frequency"])
+        merged["parameter_frequency"].update(summary["parameter_frequency"])
+    return merged
+
 #process files based on the date range
 @app.route('/process_batch_csv', methods=['GET'])
 def process_batch_csv():
@@ -56,79 +159,28 @@ def process_batch_csv():
         
         folder_summaries = {}
         
-        expected_headers = [
-            'Latitude', 'Longitude', 'Time', 'Parameter', 'Concentration', 
-            'Unit', 'Raw-Concentration', 'AQI', 'Category', 'Site-name', 
-            'Site-agency', 'AQS-ID', 'Full_AQS-ID'
-        ]
-        
         for folder, csv_files in csv_files_by_folder.items():
-            data_frames = []
-            for file in csv_files:
-                df = pd.read_csv(file, header=None)               
-                if len(df.columns) != len(expected_headers):
-                    return jsonify({"error": f"Column length mismatch in file {file}. Expected {len(expected_headers)} columns, found {len(df.columns)} columns."}), 400
-                
-                df.columns = expected_headers
-                data_frames.append(df)
-            
-            combined_df = pd.concat(data_frames, ignore_index=True)
-            combined_df['AQI'] = pd.to_numeric(combined_df['AQI'], errors='coerce')
-            combined_df['Site-name'] = combined_df['Site-name'].astype(str)
-            combined_df['Site-agency'] = combined_df['Site-agency'].astype(str)
-            combined_df['Parameter'] = combined_df['Parameter'].astype(str)
-
-            result_df = combined_df[['AQI', 'Site-name', 'Site-agency', 'Parameter']]
-            
             start_time = time.time()
-            site_name_freq = {}
-            site_agency_freq = {}
-            parameter_freq = {}
-
-            total_aqi = 0.0
-            count_aqi = 0
-
-            for index, row in result_df.iterrows():
-                aqi = row['AQI']
-                site_name = row['Site-name']
-                site_agency = row['Site-agency']
-                parameter = row['Parameter']
-
-                if pd.notna(aqi) and aqi != -999:
-                    total_aqi += aqi
-                    count_aqi += 1
-
-                if site_name in site_name_freq:
-                    site_name_freq[site_name] += 1
-                else:
-                    site_name_freq[site_name] = 1
-
-                if site_agency in site_agency_freq:
-                    site_agency_freq[site_agency] += 1
-                else:
-                    site_agency_freq[site_agency] = 1
-
-                if parameter in parameter_freq:
-                    parameter_freq[parameter] += 1
-                else:
-                    parameter_freq[parameter] = 1
 
-            avg_aqi = total_aqi / count_aqi if count_aqi > 0 else 0
+            merged = merge_summaries(summarize_file(file) for file in csv_files)
+            avg_aqi = merged["aqi_sum"] / merged["aqi_count"] if merged["aqi_count"] > 0 else 0
 
             end_time = time.time()
         
             
             folder_summaries[folder] = {
                 "time taken" : (end_time -start_time),
-                # "average_AQI": avg_aqi,
-                # "site_name_frequency": site_name_freq,
-                # "site_agency_frequency": site_agency_freq,
-                # "parameter_frequency": parameter_freq
+                "average_AQI": avg_aqi,
+                "site_name_frequency": dict(merged["site_name_frequency"]),
+                "site_agency_frequency": dict(merged["site_agency_frequency"]),
+                "parameter_frequency": dict(merged["parameter_frequency"])
             }
             
         
         return jsonify({"message": "Processed files successfully.", "summaries": folder_summaries})
     
+    except ColumnMismatchError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
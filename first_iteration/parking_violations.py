@@ -1,40 +1,159 @@
 from flask import Flask, request, jsonify
 import pandas as pd
+import numpy as np
+import csv
+import io
+import os
 
 app = Flask(__name__)
 
-violation_codes_df = pd.read_csv('../DATA/data_export/ParkingViolationCodes_January2020.csv')
-violation_fees = violation_codes_df.set_index('VIOLATION CODE').to_dict(orient='index')
+VIOLATION_CODES_FILE = '../DATA/data_export/ParkingViolationCodes_January2020.csv'
+violation_codes_df = pd.read_csv(VIOLATION_CODES_FILE)
+
+fee_columns = {
+    "Manhattan": "Manhattan  96th St. & below\n(Fine Amount $)",
+    "Base": "All Other Areas\n(Fine Amount $)",
+}
+
+# Dense fee array indexed by violation code; codes missing from the table cost 0
+def build_fee_table(codes_df, fee_column):
+    codes = pd.to_numeric(codes_df['VIOLATION CODE'], errors='coerce')
+    fees = pd.to_numeric(codes_df[fee_column], errors='coerce').fillna(0)
+    valid = codes.notna() & (codes >= 0)
+    codes, fees = codes[valid].astype(np.int64), fees[valid]
+
+    dtype = np.int64 if (fees % 1 == 0).all() else np.float64
+    table = np.zeros(codes.max() + 1 if len(codes) else 1, dtype=dtype)
+    table[codes.to_numpy()] = fees.to_numpy(dtype=dtype)
+    return table
+
+fee_tables = {fee_type: build_fee_table(violation_codes_df, column) for fee_type, column in fee_columns.items()}
+
+# Vectorized gather of the fee for every violation code
+def lookup_fees(fee_table, violation_codes):
+    codes = pd.to_numeric(pd.Series(violation_codes), errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+    fees = np.zeros(len(codes), dtype=fee_table.dtype)
+    in_table = (codes >= 0) & (codes < len(fee_table))
+    fees[in_table] = fee_table[codes[in_table]]
+    return fees
+
+PARKING_FILE = '../DATA/data_export/Parking_Violations_Issued_2022.csv'
+
+columns = [
+    "Summons Number", "Plate ID", "Registration State", "Issue Date",
+    "Street Name", "Violation Code", "Violation Description"
+]
+
+# Plate index currently in memory, keyed by the CSV stat it was built from
+plate_index = {}
+
+def index_path_for(file_path):
+    return file_path + '.plate_index.npz'
+
+def file_signature(file_path):
+    stat = os.stat(file_path)
+    return stat.st_size, stat.st_mtime_ns
+
+# One pass over the CSV recording the byte offset of every row, grouped by plate
+def build_plate_index(file_path):
+    size, mtime_ns = file_signature(file_path)
+    batch_size = 10**6
+    plate_batches, offset_batches = [], []
+    plates, offsets = [], []
+
+    with open(file_path, 'rb') as f:
+        header = f.readline()
+        plate_col = next(csv.reader([header.decode('utf-8')])).index("Plate ID")
+        offset = len(header)
+        for line in f:
+            if b'"' in line:
+                fields = next(csv.reader([line.decode('utf-8', 'replace')]))
+                plate = fields[plate_col].encode('utf-8') if len(fields) > plate_col else b''
+            else:
+                fields = line.split(b',', plate_col + 1)
+                plate = fields[plate_col] if len(fields) > plate_col else b''
+            plates.append(plate)
+            offsets.append(offset)
+            offset += len(line)
+            if len(plates) == batch_size:
+                plate_batches.append(np.array(plates, dtype='S'))
+                offset_batches.append(np.array(offsets, dtype=np.int64))
+                plates, offsets = [], []
+
+    plate_batches.append(np.array(plates, dtype='S'))
+    offset_batches.append(np.array(offsets, dtype=np.int64))
+    all_plates = np.concatenate(plate_batches)
+    all_offsets = np.concatenate(offset_batches)
+
+    # Stable sort keeps each plate's rows in file order
+    order = np.argsort(all_plates, kind='stable')
+    sorted_plates = all_plates[order]
+    unique_plates, starts = np.unique(sorted_plates, return_index=True)
+    starts = np.append(starts, len(sorted_plates)).astype(np.int64)
+
+    index = {
+        "plates": unique_plates,
+        "starts": starts,
+        "offsets": all_offsets[order],
+        "size": np.int64(size),
+        "mtime_ns": np.int64(mtime_ns),
+    }
+
+    tmp_path = index_path_for(file_path) + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **index)
+    os.replace(tmp_path, index_path_for(file_path))
+    return index
+
+# Load the sidecar index, rebuilding it when the CSV size or mtime has changed
+def get_plate_index(file_path):
+    signature = file_signature(file_path)
+    if plate_index.get("signature") == signature:
+        return plate_index["index"]
+
+    index = None
+    path = index_path_for(file_path)
+    if os.path.exists(path):
+        with np.load(path) as data:
+            if (data["size"].item(), data["mtime_ns"].item()) == signature:
+                index = {key: data[key] for key in data.files}
+    if index is None:
+        index = build_plate_index(file_path)
+
+    plate_index["signature"] = signature
+    plate_index["index"] = index
+    return index
+
+def lookup_plate_offsets(index, plate_number):
+    plate = plate_number.encode('utf-8')
+    plates = index["plates"]
+    i = np.searchsorted(plates, plate)
+    if i < len(plates) and plates[i] == plate:
+        return index["offsets"][index["starts"][i]:index["starts"][i + 1]]
+    return index["offsets"][:0]
 
 def search_parking_violations(file_path, plate_number):
-    columns = [
-        "Summons Number", "Plate ID", "Registration State", "Issue Date",
-        "Street Name", "Violation Code", "Violation Description"
-    ]
-    
-    chunksize = 10**6  # Adjust the chunk size as needed
-    results = []
-
-    for chunk in pd.read_csv(file_path, usecols=columns, chunksize=chunksize):
-        # Filter the chunk based on the plate number
-        filtered_chunk = chunk[chunk["Plate ID"] == plate_number]
-        results.append(filtered_chunk)
-
-    result_df = pd.concat(results)
-    
-    result_df["Manhattan Fee"] = result_df["Violation Code"].apply(lambda code: calculate_fee(code, "Manhattan"))
-    result_df["Base Fee"] = result_df["Violation Code"].apply(lambda code: calculate_fee(code, "Base"))
+    offsets = lookup_plate_offsets(get_plate_index(file_path), plate_number)
+
+    # Seek straight to the matching rows instead of scanning the whole file
+    with open(file_path, 'rb') as f:
+        lines = [f.readline()]
+        for offset in offsets:
+            f.seek(offset)
+            lines.append(f.readline())
+
+    result_df = pd.read_csv(io.BytesIO(b''.join(lines)), usecols=columns, dtype={"Plate ID": str})
+
+    result_df["Manhattan Fee"] = lookup_fees(fee_tables["Manhattan"], result_df["Violation Code"])
+    result_df["Base Fee"] = lookup_fees(fee_tables["Base"], result_df["Violation Code"])
 
     return result_df
 
 def calculate_fee(violation_code, fee_type):
     # Get the fee based on the violation code
-    fee_info = violation_fees.get(violation_code, {})
-    if fee_type == "Manhattan":
-        return fee_info.get("Manhattan  96th St. & below\n(Fine Amount $)", 0)
-    elif fee_type == "Base":
-        return fee_info.get("All Other Areas\n(Fine Amount $)", 0)
-    return 0
+    if fee_type not in fee_tables:
+        return 0
+    return lookup_fees(fee_tables[fee_type], [violation_code])[0]
 
 @app.route('/search', methods=['GET'])
 def search():
@@ -42,10 +161,11 @@ def search():
     if not plate_number:
         return jsonify({"error": "plate_number parameter is required"}), 400
 
-    file_path = '../DATA/data_export/Parking_Violations_Issued_2022.csv'
-    result_df = search_parking_violations(file_path, plate_number)
+    result_df = search_parking_violations(PARKING_FILE, plate_number)
     result = result_df.to_dict(orient='records')
     return jsonify(result)
 
 if __name__ == '__main__':
+    # Build or refresh the plate index before serving so requests only seek
+    get_plate_index(PARKING_FILE)
     app.run(debug=True)
\ No newline at end of file
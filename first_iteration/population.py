@@ -1,21 +1,43 @@
 from flask import Flask, jsonify, request
 import pandas as pd
+import numpy as np
 import time
 app = Flask(__name__)
 
 df = pd.read_csv('../DATA/API_SP.POP.TOTL_DS2_en_csv_v2_3401680/API_SP.POP.TOTL_DS2_en_csv_v2_3401680.csv')
 
-df = df[['Country Name', 'Country Code'] + [str(year) for year in range(1960, 2022)]]
+years = [str(year) for year in range(1960, 2022)]
+df = df[['Country Name', 'Country Code'] + years]
+
+# Indexed store built once at load: hash maps on the normalized country name and on
+# Country Code, a dense country x year matrix, and precomputed per-country/per-year totals
+year_index = {year: i for i, year in enumerate(years)}
+country_index = {}
+code_index = {}
+for row, (name, code) in enumerate(zip(df['Country Name'], df['Country Code'])):
+    country_index.setdefault(str(name).lower(), row)
+    code_index.setdefault(str(code).lower(), row)
+
+population_matrix = df[years].to_numpy(dtype=np.float64)
+country_totals = np.nansum(population_matrix, axis=1)
+year_totals = np.nansum(population_matrix, axis=0)
+
+# Row of a country given its name or its Country Code, or None
+def find_country(country):
+    key = country.lower()
+    row = country_index.get(key)
+    return row if row is not None else code_index.get(key)
 
 @app.route('/population/<country>/<year>', methods=['GET'])
 def get_population_by_year(country, year):
     start_time = time.time()
     try:
         year = str(year)
-        result = df[df['Country Name'].str.lower() == country.lower()][['Country Name', year]]
+        row = find_country(country)
+        col = year_index.get(year)
         end_time = time.time()
-        if not result.empty:
-            population = result[year].values[0]
+        if row is not None and col is not None:
+            population = float(population_matrix[row, col])
             return jsonify({"Time" : (end_time - start_time) , "Country": country, "Year": year, "Population": population})
         else:
             return jsonify({"error": "Country or Year not found"}), 404
@@ -27,10 +49,10 @@ def get_population_by_year(country, year):
 def get_cumulative_population_by_country(country):
     start_time = time.time()
     try:
-        result = df[df['Country Name'].str.lower() == country.lower()]
+        row = find_country(country)
         end_time = time.time()
-        if not result.empty:
-            population_sum = result.iloc[:, 2:].sum(axis=1).values[0]
+        if row is not None:
+            population_sum = float(country_totals[row])
             return jsonify({"Time" : (end_time - start_time) ,"Country": country, "Cumulative Population": population_sum})
         else:
             return jsonify({"error": "Country not found"}), 404
@@ -43,8 +65,8 @@ def get_cumulative_population_by_year(year):
     start_time = time.time()
     try:
         year = str(year)
-        if year in df.columns:
-            population_sum = df[year].sum()
+        if year in year_index:
+            population_sum = float(year_totals[year_index[year]])
             end_time = time.time()
             return jsonify({"Time" : (end_time - start_time) ,"Year": year, "Cumulative Population": population_sum})
         else:
@@ -0,0 +1,113 @@
+import bisect
+import json
+import os
+import threading
+import time
+
+# Sorted in-memory catalog of AirNow day files (date -> path), persisted as a JSON
+# manifest and kept fresh by polling directory mtimes in a background thread, so
+# resolving a date range is a binary search with no directory walk
+
+catalog = {
+    "index": ([], []),  # (sorted file dates, (date, folder, path) entries in the same order)
+    "mtimes": {},       # directory path -> mtime_ns when it was last listed
+    "folders": {},      # folder name -> [(date, path), ...]
+}
+catalog_lock = threading.Lock()
+start_lock = threading.Lock()
+polling_started = threading.Event()
+
+def list_folder(folder_path):
+    files = []
+    for file in os.listdir(folder_path):
+        if file.endswith('.csv'):
+            files.append((file.split('.')[0], os.path.join(folder_path, file)))
+    return sorted(files)
+
+def publish(mtimes, folders):
+    entries = sorted((date, folder, path) for folder, files in folders.items() for date, path in files)
+    # Readers take the (dates, entries) pair in one read, so swap it in as one object
+    catalog["index"] = ([entry[0] for entry in entries], entries)
+    catalog["mtimes"] = mtimes
+    catalog["folders"] = folders
+
+# Re-list only the directories whose mtime changed since the last refresh. The summary
+# and rollup sidecars written next to the CSVs also bump folder mtimes, so the index is
+# only republished when the listed .csv files actually differ.
+def refresh_catalog(data_dir, manifest_path=None):
+    with catalog_lock:
+        old_mtimes = catalog["mtimes"]
+        mtimes = {data_dir: os.stat(data_dir).st_mtime_ns}
+        if mtimes[data_dir] == old_mtimes.get(data_dir):
+            folder_names = list(catalog["folders"])
+        else:
+            folder_names = [name for name in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, name))]
+
+        folders = {}
+        for folder_name in folder_names:
+            folder_path = os.path.join(data_dir, folder_name)
+            try:
+                mtimes[folder_path] = os.stat(folder_path).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            if mtimes[folder_path] == old_mtimes.get(folder_path):
+                folders[folder_name] = catalog["folders"][folder_name]
+            else:
+                folders[folder_name] = list_folder(folder_path)
+
+        changed = folders != catalog["folders"]
+        if changed:
+            publish(mtimes, folders)
+        elif mtimes != old_mtimes:
+            catalog["mtimes"] = mtimes
+        if manifest_path and mtimes != old_mtimes:
+            save_manifest(manifest_path)
+        return changed
+
+def save_manifest(manifest_path):
+    manifest = {"mtimes": catalog["mtimes"], "folders": catalog["folders"]}
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+# Seed the catalog from the manifest; refresh_catalog then only re-lists what changed
+def load_manifest(manifest_path):
+    if not os.path.exists(manifest_path):
+        return False
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    folders = {name: [tuple(file) for file in files] for name, files in manifest["folders"].items()}
+    with catalog_lock:
+        publish(manifest["mtimes"], folders)
+    return True
+
+def poll_catalog(data_dir, manifest_path, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            refresh_catalog(data_dir, manifest_path)
+        except OSError:
+            pass
+
+def start_catalog(data_dir, manifest_path, interval=30):
+    if polling_started.is_set():
+        return
+    with start_lock:
+        if polling_started.is_set():
+            return
+        load_manifest(manifest_path)
+        refresh_catalog(data_dir, manifest_path)
+        thread = threading.Thread(target=poll_catalog, args=(data_dir, manifest_path, interval), daemon=True)
+        thread.start()
+        polling_started.set()
+
+# Files dated start_date..end_date (inclusive, YYYYMMDD strings), grouped by folder
+def files_in_date_range(start_date, end_date):
+    dates, entries = catalog["index"]
+    lo = bisect.bisect_left(dates, start_date)
+    hi = bisect.bisect_right(dates, end_date)
+    csv_files_by_folder = {}
+    for date, folder, path in entries[lo:hi]:
+        csv_files_by_folder.setdefault(folder, []).append(path)
+    return csv_files_by_folder
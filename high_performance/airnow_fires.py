@@ -1,144 +1,434 @@
 import os
+import csv
+import json
+import math
+import multiprocessing
 import pandas as pd
 import time
+from collections import Counter, deque
 from flask import Flask, request, jsonify
-from numba import njit, prange ,typed , types
-from numba.typed import List
+import numpy as np
+from numba import njit, prange
+from concurrent.futures import ProcessPoolExecutor
+from readiness import install_readiness
+from datasets import AIRNOW_DATA_DIR, require_ingested
+from metrics import install_metrics
+from serialization import requested_format, format_error, frame_response, json_response
+from result_cache import ResultCache, cached_response, add_cache_stats_route
+from airnow_catalog import catalog, start_catalog, files_in_date_range
+from airnow_rollups import rollup_files, site_series, grid_series, build_site_index, sites_in_bbox, nearest_sites
 
 app = Flask(__name__)
+metrics = install_metrics(app, 'airnow_fires')
 
-DATA_DIR = '../DATA\AirNow fires/fire-2020-full-data/data' 
+DATA_DIR = AIRNOW_DATA_DIR
 EXPORT_DIR = '../../'
+CATALOG_FILE = os.path.join(DATA_DIR, '..', 'catalog.json')
+CATALOG_POLL_SECONDS = 30
 
+# The parallel Numba kernel only ever runs in these workers, never in the service
+# process: launched from a non-main thread (the loader, a request thread) it can hang
+# interpreter exit under the TBB threading layer. Workers are spawned, not forked, so
+# they start clean whatever threads the service has running.
+max_workers = os.cpu_count()
+executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+
+# Resolved from the in-memory catalog; the directory tree is only walked by the
+# background refresh, never on the request path
 def get_csv_files_in_date_range(start_date, end_date):
-    csv_files_by_folder = {}
-    for folder_name in os.listdir(DATA_DIR):
-        folder_path = os.path.join(DATA_DIR, folder_name)
-        if os.path.isdir(folder_path):
-            csv_files = []
-            for file in os.listdir(folder_path):
-                if file.endswith('.csv'):
-                    file_date = file.split('.')[0]
-                    if start_date <= file_date <= end_date:
-                        csv_files.append(os.path.join(folder_path, file))
-            if csv_files:
-                csv_files_by_folder[folder_name] = csv_files
-    return csv_files_by_folder
-
-@njit(parallel=True)
-def compute_dataframe(aqi_values, site_name_values, site_agency_values, parameter_values):
+    start_catalog(DATA_DIR, CATALOG_FILE, CATALOG_POLL_SECONDS)
+    return files_in_date_range(start_date, end_date)
+
+# Rows are split into a fixed number of chunks so the float sums are merged in the
+# same order on every run, whatever the thread count
+KERNEL_CHUNKS = 64
+
+# Per-chunk partial sums and bincounts over dictionary-encoded columns; each chunk
+# writes only its own row of the partial arrays, and the rows are merged at the end
+@njit(parallel=True, cache=True)
+def compute_dataframe(aqi_values, site_name_codes, n_site_names, site_agency_codes, n_site_agencies,
+                      parameter_codes, n_parameters, n_chunks):
+    n = len(aqi_values)
+    chunk_size = (n + n_chunks - 1) // n_chunks
+
+    aqi_sums = np.zeros(n_chunks)
+    aqi_counts = np.zeros(n_chunks, dtype=np.int64)
+    site_name_counts = np.zeros((n_chunks, n_site_names), dtype=np.int64)
+    site_agency_counts = np.zeros((n_chunks, n_site_agencies), dtype=np.int64)
+    parameter_counts = np.zeros((n_chunks, n_parameters), dtype=np.int64)
+
+    for c in prange(n_chunks):
+        for i in range(c * chunk_size, min((c + 1) * chunk_size, n)):
+            aqi = aqi_values[i]
+            if aqi == aqi and aqi != -999:
+                aqi_sums[c] += aqi
+                aqi_counts[c] += 1
+
+            if site_name_codes[i] >= 0:
+                site_name_counts[c, site_name_codes[i]] += 1
+            if site_agency_codes[i] >= 0:
+                site_agency_counts[c, site_agency_codes[i]] += 1
+            if parameter_codes[i] >= 0:
+                parameter_counts[c, parameter_codes[i]] += 1
+
     total_aqi = 0.0
     count_aqi = 0
-    site_name_freq = typed.Dict.empty(key_type=types.unicode_type, value_type=types.int64)
-    site_agency_freq = typed.Dict.empty(key_type=types.unicode_type, value_type=types.int64)
-    parameter_freq = typed.Dict.empty(key_type=types.unicode_type, value_type=types.int64)
+    site_name_freq = np.zeros(n_site_names, dtype=np.int64)
+    site_agency_freq = np.zeros(n_site_agencies, dtype=np.int64)
+    parameter_freq = np.zeros(n_parameters, dtype=np.int64)
+    for c in range(n_chunks):
+        total_aqi += aqi_sums[c]
+        count_aqi += aqi_counts[c]
+        site_name_freq += site_name_counts[c]
+        site_agency_freq += site_agency_counts[c]
+        parameter_freq += parameter_counts[c]
+
+    return total_aqi, count_aqi, site_name_freq, site_agency_freq, parameter_freq
+
+expected_headers = [
+    'Latitude', 'Longitude', 'Time', 'Parameter', 'Concentration', 
+    'Unit', 'Raw-Concentration', 'AQI', 'Category', 'Site-name', 
+    'Site-agency', 'AQS-ID', 'Full_AQS-ID'
+]
+
+class ColumnMismatchError(Exception):
+    pass
+
+# AQI sum/count and frequency counters for one DataFrame; string columns are
+# dictionary-encoded to integer codes before they reach the kernel
+def summarize_dataframe(result_df):
+    aqi_values = result_df['AQI'].to_numpy(dtype=np.float64)
+    site_name_codes, site_names = pd.factorize(result_df['Site-name'])
+    site_agency_codes, site_agencies = pd.factorize(result_df['Site-agency'])
+    parameter_codes, parameters = pd.factorize(result_df['Parameter'])
+
+    total_aqi, count_aqi, site_name_freq, site_agency_freq, parameter_freq = compute_dataframe(
+        aqi_values,
+        site_name_codes.astype(np.int64), len(site_names),
+        site_agency_codes.astype(np.int64), len(site_agencies),
+        parameter_codes.astype(np.int64), len(parameters),
+        KERNEL_CHUNKS
+    )
+
+    return {
+        "aqi_sum": float(total_aqi),
+        "aqi_count": int(count_aqi),
+        "site_name_frequency": {str(name): int(count) for name, count in zip(site_names, site_name_freq) if count},
+        "site_agency_frequency": {str(agency): int(count) for agency, count in zip(site_agencies, site_agency_freq) if count},
+        "parameter_frequency": {str(param): int(count) for param, count in zip(parameters, parameter_freq) if count}
+    }
+
+def summary_path_for(file):
+    return file + '.summary.json'
 
-    for i in prange(len(aqi_values)):
-        print(i)
-        aqi = aqi_values[i]
-        site_name = site_name_values[i]
-        site_agency = site_agency_values[i]
-        parameter = parameter_values[i]
+# Only these columns feed the summaries; strings are read straight into categoricals
+summary_columns = ['AQI', 'Site-name', 'Site-agency', 'Parameter']
+string_dtypes = {'Site-name': 'category', 'Site-agency': 'category', 'Parameter': 'category'}
 
-        if aqi != -999:
-            total_aqi += aqi
-            count_aqi += 1
+# Memory ceiling for in-flight parsing, split evenly across the files being read at once.
+# BYTES_PER_ROW is a conservative estimate of parser plus DataFrame memory per pruned row.
+MEMORY_CEILING_MB = int(os.environ.get('AIRNOW_MEMORY_CEILING_MB', 512))
+BYTES_PER_ROW = 256
+MIN_CHUNK_ROWS = 10000
 
-        if site_name in site_name_freq:
-            site_name_freq[site_name] += 1
-        else:
-            site_name_freq[site_name] = 1
+def chunk_rows_for(memory_ceiling_mb, in_flight):
+    return max(MIN_CHUNK_ROWS, memory_ceiling_mb * 2**20 // (in_flight * BYTES_PER_ROW))
 
-        if site_agency in site_agency_freq:
-            site_agency_freq[site_agency] += 1
-        else:
-            site_agency_freq[site_agency] = 1
+# Yield the summary columns of one file in chunks of at most chunk_rows rows;
+# the column count is checked on the first line
+def iter_airnow_chunks(file, chunk_rows):
+    with open(file, newline='') as f:
+        first_line = f.readline()
+    if not first_line:
+        return
 
-        if parameter in parameter_freq:
-            parameter_freq[parameter] += 1
-        else:
-            parameter_freq[parameter] = 1
+    column_count = len(next(csv.reader([first_line])))
+    if column_count != len(expected_headers):
+        raise ColumnMismatchError(f"Column length mismatch in file {file}. Expected {len(expected_headers)} columns, found {column_count} columns.")
 
-    avg_aqi = total_aqi / count_aqi if count_aqi > 0 else 0
+    reader = pd.read_csv(file, header=None, names=expected_headers, usecols=summary_columns,
+                         dtype=string_dtypes, chunksize=chunk_rows)
+    for df in reader:
+        df['AQI'] = pd.to_numeric(df['AQI'], errors='coerce').astype(np.float32)
+        # Missing strings are counted as 'nan', as astype(str) did on the full read
+        for col in string_dtypes:
+            if df[col].isna().any():
+                if 'nan' not in df[col].cat.categories:
+                    df[col] = df[col].cat.add_categories(['nan'])
+                df[col] = df[col].fillna('nan')
+        yield df[summary_columns]
 
-    return avg_aqi, site_name_freq, site_agency_freq, parameter_freq
+def load_cached_summary(file):
+    stat = os.stat(file)
+    summary_path = summary_path_for(file)
+    if os.path.exists(summary_path):
+        with open(summary_path) as f:
+            summary = json.load(f)
+        if summary["size"] == stat.st_size and summary["mtime_ns"] == stat.st_mtime_ns:
+            return summary
+    return None
+
+# Per-day summary, computed once and reused until the CSV's size or mtime changes.
+# Chunks are folded into a running summary so only one chunk is held at a time.
+# Runs in a worker, so freshly computed summaries carry their parse/kernel timings
+# and row/byte counts back under "stats" for the parent to record; cached ones do not.
+def summarize_file(file, chunk_rows):
+    summary = load_cached_summary(file)
+    if summary is not None:
+        return summary
+
+    stat = os.stat(file)
+    stats = {"parse_seconds": 0.0, "kernel_seconds": 0.0, "rows": 0, "bytes": stat.st_size}
+    summary = merge_summaries([])
+    chunks = iter_airnow_chunks(file, chunk_rows)
+    while True:
+        start = time.perf_counter()
+        chunk = next(chunks, None)
+        stats["parse_seconds"] += time.perf_counter() - start
+        if chunk is None:
+            break
+        start = time.perf_counter()
+        merge_summaries([summarize_dataframe(chunk)], summary)
+        stats["kernel_seconds"] += time.perf_counter() - start
+        stats["rows"] += len(chunk)
+    summary["size"] = stat.st_size
+    summary["mtime_ns"] = stat.st_mtime_ns
+
+    summary_path = summary_path_for(file)
+    tmp_path = summary_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(summary, f)
+    os.replace(tmp_path, summary_path)
+    summary["stats"] = stats
+    return summary
+
+def record_summary_stats(summary):
+    stats = summary.pop("stats", None)
+    if stats is None:
+        metrics.count('summary_cache_hits_total')
+        return
+    metrics.observe('stage_seconds', stats["parse_seconds"], stage='parse')
+    metrics.observe('stage_seconds', stats["kernel_seconds"], stage='kernel')
+    metrics.processed('parse', rows=stats["rows"], nbytes=stats["bytes"])
+
+# Yield (file, summary) pairs; cached summaries come straight back and uncached files
+# fan out across the pool with at most in_flight of them being parsed at once
+def iter_file_summaries(files, in_flight, chunk_rows):
+    pending = deque()
+    for file in files:
+        summary = load_cached_summary(file)
+        if summary is not None:
+            metrics.count('summary_cache_hits_total')
+            yield file, summary
+            continue
+        pending.append((file, executor.submit(summarize_file, file, chunk_rows)))
+        if len(pending) >= in_flight:
+            done_file, future = pending.popleft()
+            summary = future.result()
+            record_summary_stats(summary)
+            yield done_file, summary
+
+    while pending:
+        done_file, future = pending.popleft()
+        summary = future.result()
+        record_summary_stats(summary)
+        yield done_file, summary
+
+# Fold summaries into a running total (a fresh one unless `merged` is given)
+def merge_summaries(summaries, merged=None):
+    if merged is None:
+        merged = {
+            "aqi_sum": 0.0,
+            "aqi_count": 0,
+            "site_name_frequency": Counter(),
+            "site_agency_frequency": Counter(),
+            "parameter_frequency": Counter()
+        }
+    for summary in summaries:
+        merged["aqi_sum"] += summary["aqi_sum"]
+        merged["aqi_count"] += summary["aqi_count"]
+        merged["site_name_frequency"].update(summary["site_name_frequency"])
+        merged["site_agency_frequency"].update(summary["site_agency_frequency"])
+        merged["parameter_frequency"].update(summary["parameter_frequency"])
+    return merged
+
+def frequency_columns(frequency):
+    return {"values": list(frequency), "counts": np.fromiter(frequency.values(), dtype=np.int64, count=len(frequency))}
+
+# Responses are cached per date range, keyed on the size and mtime of every file in it;
+# max_memory_mb only changes how the files are parsed, not the answer
+result_cache = ResultCache()
+add_cache_stats_route(app, result_cache)
 
 @app.route('/process_batch_csv', methods=['GET'])
 def process_batch_csv():
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
-    start_time = time.time()
 
     if not start_date or not end_date:
         return jsonify({"error": "Please provide both start_date and end_date in format YYYYMMDD"}), 400
     
     try:
-        csv_files_by_folder = get_csv_files_in_date_range(start_date, end_date)
+        with metrics.timer('discovery'):
+            csv_files_by_folder = get_csv_files_in_date_range(start_date, end_date)
         
         if not csv_files_by_folder:
             return jsonify({"message": "No files found in the provided date range."})
         
-        folder_summaries = {}
-        
-        expected_headers = [
-            'Latitude', 'Longitude', 'Time', 'Parameter', 'Concentration', 
-            'Unit', 'Raw-Concentration', 'AQI', 'Category', 'Site-name', 
-            'Site-agency', 'AQS-ID', 'Full_AQS-ID'
-        ]
-        
-        for folder, csv_files in csv_files_by_folder.items():
-            
-            data_frames = []
-            for file in csv_files:
-                df = pd.read_csv(file, header=None)              
-                if len(df.columns) != len(expected_headers):
-                    return jsonify({"error": f"Column length mismatch in file {file}. Expected {len(expected_headers)} columns, found {len(df.columns)} columns."}), 400
-                df.columns = expected_headers
-                data_frames.append(df)
-            
-            combined_df = pd.concat(data_frames, ignore_index=True)
+        memory_ceiling_mb = request.args.get('max_memory_mb', default=MEMORY_CEILING_MB, type=int)
+        if memory_ceiling_mb <= 0:
+            return jsonify({"error": "max_memory_mb must be a positive integer"}), 400
+        chunk_rows = chunk_rows_for(memory_ceiling_mb, max_workers)
+        files = [file for csv_files in csv_files_by_folder.values() for file in csv_files]
 
-            combined_df['AQI'] = pd.to_numeric(combined_df['AQI'], errors='coerce')
-            combined_df['Site-name'] = combined_df['Site-name'].astype(str)
-            combined_df['Site-agency'] = combined_df['Site-agency'].astype(str)
-            combined_df['Parameter'] = combined_df['Parameter'].astype(str)
+        # format=columns sends each frequency table as parallel value/count arrays
+        fmt = requested_format()
+        if fmt == 'arrow':
+            return jsonify({"error": "format=arrow is only available for tabular responses"}), 400
+        error = format_error(fmt)
+        if error:
+            return error
+        encode_frequency = frequency_columns if fmt == 'columns' else dict
 
-            result_df = combined_df[['AQI', 'Site-name', 'Site-agency', 'Parameter']]
-            
-            aqi_values = result_df['AQI'].values.astype(float)
-            site_name_values = List([
-                str(name) if isinstance(name, str) else "unknown"
-                for name in result_df['Site-name'].values.tolist()
-            ])
-
-            site_agency_values = List([
-                str(agency) if isinstance(agency, str) else "unknown"
-                for agency in result_df['Site-agency'].values.tolist()
-            ])
-
-            parameter_values = List([
-                str(param) if isinstance(param, str) else "unknown"
-                for param in result_df['Parameter'].values.tolist()
-            ])
-            
-            avg_aqi, site_name_freq, site_agency_freq, parameter_freq = compute_dataframe(
-                aqi_values, site_name_values, site_agency_values, parameter_values
-            )
+        def build():
+            start_time = time.time()
+            folder_summaries = {}
+            folder_of = {file: folder for folder, csv_files in csv_files_by_folder.items() for file in csv_files}
+            running = {folder: merge_summaries([]) for folder in csv_files_by_folder}
 
+            # Each file's summary is folded into its folder's running total as soon as it arrives
+            for file, summary in iter_file_summaries(list(folder_of), max_workers, chunk_rows):
+                with metrics.timer('merge'):
+                    merge_summaries([summary], running[folder_of[file]])
+
+            # All folders are summarized in one pass, so each reports the time of that pass
             end_time = time.time()
+            for folder, merged in running.items():
+            
+                avg_aqi = merged["aqi_sum"] / merged["aqi_count"] if merged["aqi_count"] > 0 else 0
                         
-            folder_summaries[folder] = {
-                "time taken": (end_time - start_time),
-                # "average_AQI": avg_aqi,
-                # "site_name_frequency": dict(site_name_freq),
-                # "site_agency_frequency": dict(site_agency_freq),
-                # "parameter_frequency": dict(parameter_freq)
-            }
+                folder_summaries[folder] = {
+                    "time taken": (end_time - start_time),
+                    "average_AQI": avg_aqi,
+                    "site_name_frequency": encode_frequency(merged["site_name_frequency"]),
+                    "site_agency_frequency": encode_frequency(merged["site_agency_frequency"]),
+                    "parameter_frequency": encode_frequency(merged["parameter_frequency"])
+                }
                     
-        return jsonify({"message": "Processed files successfully.", "summaries": folder_summaries})
-    
+            with metrics.timer('serialize'):
+                payload = {"message": "Processed files successfully.", "summaries": folder_summaries}
+                return json_response(payload) if fmt == 'columns' else jsonify(payload)
+
+        return cached_response(result_cache, ('process_batch_csv', start_date, end_date, fmt), files, build)
+
+    except ColumnMismatchError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Compile (or load from the on-disk cache) the kernel for the exact argument types used
+# by summarize_dataframe, so the first request does not pay for JIT compilation. Run in
+# the pool workers by load_data.
+def warmup():
+    summarize_dataframe(pd.DataFrame({
+        'AQI': np.array([1.0, -999.0]),
+        'Site-name': ['a', 'b'],
+        'Site-agency': ['a', 'b'],
+        'Parameter': ['a', 'b']
+    }))
+
+def load_data():
+    require_ingested('airnow')
+    start_catalog(DATA_DIR, CATALOG_FILE, CATALOG_POLL_SECONDS)
+    # One task per worker starts the whole pool, each worker on its own main thread
+    for future in [executor.submit(warmup) for _ in range(max_workers)]:
+        future.result()
+
+start_loading = install_readiness(app, load_data)
+
+# Files in the requested date range, or an error response
+def load_range_files():
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    if not start_date or not end_date:
+        return None, (jsonify({"error": "Please provide both start_date and end_date in format YYYYMMDD"}), 400)
+
+    with metrics.timer('discovery'):
+        csv_files_by_folder = get_csv_files_in_date_range(start_date, end_date)
+    return [file for csv_files in csv_files_by_folder.values() for file in csv_files], None
+
+def series_response(series, fmt):
+    with metrics.timer('serialize'):
+        series['time'] = series['time'].dt.strftime('%Y-%m-%dT%H:%M')
+        return frame_response(series, fmt, lambda: jsonify(series.to_dict(orient='records')))
+
+# Rollup series for the date range, cached per path and query string
+def cached_series(series_for):
+    fmt = requested_format()
+    error = format_error(fmt)
+    if error:
+        return error
+    files, error = load_range_files()
+    if error:
+        return error
+    key = (request.path, tuple(sorted(request.args.items(multi=True))), fmt)
+
+    def build():
+        with metrics.timer('rollup'):
+            series = series_for(rollup_files(files, expected_headers, executor))
+        return series_response(series, fmt)
+
+    return cached_response(result_cache, key, files, build)
+
+@app.route('/aqi/<resolution>', methods=['GET'])
+def get_aqi_by_site(resolution):
+    if resolution not in ('hourly', 'daily'):
+        return jsonify({"error": "resolution must be hourly or daily"}), 404
+
+    site = request.args.get('site')
+    return cached_series(lambda rollup: site_series(rollup, resolution, site))
+
+@app.route('/aqi/grid', methods=['GET'])
+def get_aqi_by_grid():
+    resolution = request.args.get('resolution', default='daily')
+    cell_size = request.args.get('cell_size', default=0.5, type=float)
+    if resolution not in ('hourly', 'daily') or cell_size <= 0:
+        return jsonify({"error": "resolution must be hourly or daily and cell_size positive"}), 400
+
+    return cached_series(lambda rollup: grid_series(rollup, resolution, cell_size))
+
+# Spatial index over every site in the catalog, rebuilt when the catalog changes
+site_index_cache = {}
+
+def get_site_index():
+    start_catalog(DATA_DIR, CATALOG_FILE, CATALOG_POLL_SECONDS)
+    catalog_index = catalog["index"]
+    if site_index_cache.get("catalog_index") is not catalog_index:
+        files = [path for date, folder, path in catalog_index[1]]
+        site_index_cache["site_index"] = build_site_index(rollup_files(files, expected_headers, executor))
+        site_index_cache["catalog_index"] = catalog_index
+    return site_index_cache["site_index"]
+
+@app.route('/sites/bbox', methods=['GET'])
+def get_sites_in_bbox():
+    bounds = [request.args.get(name, type=float) for name in ('min_lat', 'max_lat', 'min_lon', 'max_lon')]
+    if (any(bound is None or not math.isfinite(bound) for bound in bounds)
+            or bounds[0] > bounds[1] or bounds[2] > bounds[3]):
+        return jsonify({"error": "Please provide finite numeric min_lat <= max_lat and min_lon <= max_lon"}), 400
+    return jsonify(sites_in_bbox(get_site_index(), *bounds))
+
+@app.route('/sites/nearest', methods=['GET'])
+def get_nearest_sites():
+    lat = request.args.get('lat', type=float)
+    lon = request.args.get('lon', type=float)
+    k = request.args.get('k', default=5, type=int)
+    if lat is None or lon is None or k < 1:
+        return jsonify({"error": "Please provide numeric lat and lon and a positive k"}), 400
+    # The comparisons are False for NaN, so they also reject it; infinities fall outside the ranges
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return jsonify({"error": "lat must be within [-90, 90] and lon within [-180, 180]"}), 400
+    return jsonify(nearest_sites(get_site_index(), lat, lon, k))
+
 if __name__ == '__main__':
+    start_loading()
     app.run(debug=False)
@@ -0,0 +1,207 @@
+import math
+import os
+import pickle
+import numpy as np
+import pandas as pd
+
+# Precomputed per-day rollups of AirNow readings: AQI sum/count/max per (hour, site)
+# with the site's coordinates. Daily, per-site and grid-cell answers are folded from
+# these small tables instead of rescanning the raw files.
+
+rollup_columns = ['Latitude', 'Longitude', 'Time', 'AQI', 'Site-name']
+
+# Column types of a rollup table, so an empty one still supports the .dt accessors
+rollup_dtypes = {
+    'hour': 'datetime64[ns]',
+    'site': object,
+    'aqi_sum': np.float64,
+    'aqi_count': np.int64,
+    'aqi_max': np.float64,
+    'latitude': np.float64,
+    'longitude': np.float64,
+}
+
+# Kilometres per degree of latitude, for reporting equirectangular distances
+KM_PER_DEGREE = 111.195
+
+def rollup_path_for(file):
+    return file + '.rollup.pkl'
+
+def load_cached_rollup(file):
+    stat = os.stat(file)
+    rollup_path = rollup_path_for(file)
+    if os.path.exists(rollup_path):
+        with open(rollup_path, 'rb') as f:
+            cached = pickle.load(f)
+        if cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+            return cached["rollup"]
+    return None
+
+# Hourly rollup of one day file, computed once and reused until its size or mtime changes
+def rollup_file(file, headers):
+    rollup = load_cached_rollup(file)
+    if rollup is not None:
+        return rollup
+
+    stat = os.stat(file)
+    df = pd.read_csv(file, header=None, names=headers, usecols=rollup_columns,
+                     dtype={'Site-name': 'category'})
+    df['AQI'] = pd.to_numeric(df['AQI'], errors='coerce')
+    df['Latitude'] = pd.to_numeric(df['Latitude'], errors='coerce')
+    df['Longitude'] = pd.to_numeric(df['Longitude'], errors='coerce')
+    df['hour'] = pd.to_datetime(df['Time'], errors='coerce').dt.floor('h')
+    df = df[df['AQI'].notna() & (df['AQI'] != -999) & df['hour'].notna()]
+
+    rollup = df.groupby(['hour', 'Site-name'], observed=True).agg(
+        aqi_sum=('AQI', 'sum'),
+        aqi_count=('AQI', 'count'),
+        aqi_max=('AQI', 'max'),
+        latitude=('Latitude', 'mean'),
+        longitude=('Longitude', 'mean'),
+    ).reset_index().rename(columns={'Site-name': 'site'})
+    rollup['site'] = rollup['site'].astype(str)
+
+    rollup_path = rollup_path_for(file)
+    tmp_path = rollup_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump({"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "rollup": rollup}, f)
+    os.replace(tmp_path, rollup_path)
+    return rollup
+
+# Rollups for many files; uncached ones are computed across the process pool
+def rollup_files(files, headers, executor):
+    rollups = {}
+    futures = {}
+    for file in files:
+        rollup = load_cached_rollup(file)
+        if rollup is not None:
+            rollups[file] = rollup
+        else:
+            futures[file] = executor.submit(rollup_file, file, headers)
+    for file, future in futures.items():
+        rollups[file] = future.result()
+
+    tables = [rollups[file] for file in files]
+    if not tables:
+        return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in rollup_dtypes.items()})
+    return pd.concat(tables, ignore_index=True)
+
+def finish(grouped):
+    grouped['average_AQI'] = grouped['aqi_sum'] / grouped['aqi_count']
+    return grouped.drop(columns=['aqi_sum']).rename(columns={'aqi_count': 'count', 'aqi_max': 'max_AQI'})
+
+# Average/max AQI per site at hourly or daily resolution
+def site_series(rollup, resolution, site=None):
+    if site is not None:
+        rollup = rollup[rollup['site'] == site]
+    rollup = rollup.assign(time=rollup['hour'] if resolution == 'hourly' else rollup['hour'].dt.floor('D'))
+    grouped = rollup.groupby(['time', 'site']).agg(
+        aqi_sum=('aqi_sum', 'sum'), aqi_count=('aqi_count', 'sum'), aqi_max=('aqi_max', 'max'),
+        latitude=('latitude', 'mean'), longitude=('longitude', 'mean'),
+    ).reset_index()
+    return finish(grouped)
+
+# Average/max AQI per lat/lon grid cell; cells are identified by their south-west corner
+def grid_series(rollup, resolution, cell_size):
+    rollup = rollup[rollup['latitude'].notna() & rollup['longitude'].notna()]
+    rollup = rollup.assign(
+        time=rollup['hour'] if resolution == 'hourly' else rollup['hour'].dt.floor('D'),
+        cell_latitude=np.floor(rollup['latitude'] / cell_size) * cell_size,
+        cell_longitude=np.floor(rollup['longitude'] / cell_size) * cell_size,
+    )
+    grouped = rollup.groupby(['time', 'cell_latitude', 'cell_longitude']).agg(
+        aqi_sum=('aqi_sum', 'sum'), aqi_count=('aqi_count', 'sum'), aqi_max=('aqi_max', 'max'),
+        sites=('site', 'nunique'),
+    ).reset_index()
+    return finish(grouped)
+
+# Uniform lat/lon grid over site locations: cell -> indices of the sites inside it
+def build_site_index(rollup, cell_size=1.0):
+    sites = rollup.groupby('site').agg(latitude=('latitude', 'mean'), longitude=('longitude', 'mean')).dropna()
+    latitudes = sites['latitude'].to_numpy()
+    longitudes = sites['longitude'].to_numpy()
+    cell_rows = np.floor(latitudes / cell_size).astype(np.int64)
+    cell_cols = np.floor(longitudes / cell_size).astype(np.int64)
+
+    cells = {}
+    for i, cell in enumerate(zip(cell_rows.tolist(), cell_cols.tolist())):
+        cells.setdefault(cell, []).append(i)
+
+    return {
+        "names": sites.index.to_numpy(),
+        "latitude": latitudes,
+        "longitude": longitudes,
+        "cell_size": cell_size,
+        "cells": {cell: np.array(members) for cell, members in cells.items()},
+    }
+
+def site_records(site_index, members, distances=None):
+    records = []
+    for n, i in enumerate(members):
+        record = {
+            "site": str(site_index["names"][i]),
+            "latitude": float(site_index["latitude"][i]),
+            "longitude": float(site_index["longitude"][i]),
+        }
+        if distances is not None:
+            record["distance_km"] = float(distances[n])
+        records.append(record)
+    return records
+
+def sites_in_bbox(site_index, min_lat, max_lat, min_lon, max_lon):
+    cell_size = site_index["cell_size"]
+    rows = range(math.floor(min_lat / cell_size), math.floor(max_lat / cell_size) + 1)
+    cols = range(math.floor(min_lon / cell_size), math.floor(max_lon / cell_size) + 1)
+    if len(rows) * len(cols) <= len(site_index["cells"]):
+        candidates = [site_index["cells"][(r, c)] for r in rows for c in cols if (r, c) in site_index["cells"]]
+    else:
+        candidates = [members for (r, c), members in site_index["cells"].items() if r in rows and c in cols]
+    if not candidates:
+        return []
+
+    members = np.sort(np.concatenate(candidates))
+    lat = site_index["latitude"][members]
+    lon = site_index["longitude"][members]
+    inside = (lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon)
+    return site_records(site_index, members[inside])
+
+# Cells on the edge of the square `ring` cells out from (row, col)
+def ring_cells(row, col, ring):
+    if ring == 0:
+        yield row, col
+        return
+    for c in range(col - ring, col + ring + 1):
+        yield row - ring, c
+        yield row + ring, c
+    for r in range(row - ring + 1, row + ring):
+        yield r, col - ring
+        yield r, col + ring
+
+# k nearest sites by equirectangular distance, searching rings of cells outward until no
+# unvisited cell can hold a closer site than the current k-th best
+def nearest_sites(site_index, lat, lon, k):
+    cells = site_index["cells"]
+    if not cells:
+        return []
+    cell_size = site_index["cell_size"]
+    lon_scale = max(math.cos(math.radians(lat)), 1e-6)
+    row, col = math.floor(lat / cell_size), math.floor(lon / cell_size)
+    max_ring = max(max(abs(r - row), abs(c - col)) for r, c in cells)
+
+    found = []
+    for ring in range(max_ring + 1):
+        for cell in ring_cells(row, col, ring):
+            if cell in cells:
+                found.append(cells[cell])
+        if found and sum(len(members) for members in found) >= k:
+            members = np.concatenate(found)
+            distances = np.hypot(site_index["latitude"][members] - lat,
+                                 (site_index["longitude"][members] - lon) * lon_scale)
+            if np.sort(distances)[k - 1] <= ring * cell_size * lon_scale:
+                break
+
+    members = np.concatenate(found)
+    distances = np.hypot(site_index["latitude"][members] - lat,
+                         (site_index["longitude"][members] - lon) * lon_scale)
+    order = np.argsort(distances, kind='stable')[:k]
+    return site_records(site_index, members[order], distances[order] * KM_PER_DEGREE)
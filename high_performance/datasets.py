@@ -0,0 +1,74 @@
+import json
+import os
+import time
+from shared_arrays import file_signature
+
+# Locations of the raw datasets and of the ingest manifest. Everything lives under
+# DATA_ROOT, which defaults to ../DATA relative to the working directory and can be
+# moved with the DATA_ROOT environment variable.
+DATA_ROOT = os.environ.get('DATA_ROOT', os.path.join('..', 'DATA'))
+
+PARKING_FILE = os.path.join(DATA_ROOT, 'data_export', 'Parking_Violations_Issued_2022.csv')
+VIOLATION_CODES_FILE = os.path.join(DATA_ROOT, 'data_export', 'ParkingViolationCodes_January2020.csv')
+AIRNOW_DATA_DIR = os.path.join(DATA_ROOT, 'AirNow fires', 'fire-2020-full-data', 'data')
+POPULATION_FILE = os.path.join(DATA_ROOT, 'API_SP.POP.TOTL_DS2_en_csv_v2_3401680',
+                               'API_SP.POP.TOTL_DS2_en_csv_v2_3401680.csv')
+
+# Written by ingest.py. Bump MANIFEST_VERSION when the layout of any artifact changes so
+# services ignore manifests written by an older ingest.
+MANIFEST_FILE = os.path.join(DATA_ROOT, 'ingest_manifest.json')
+MANIFEST_VERSION = 1
+
+# With REQUIRE_INGEST=1 a service refuses to load (/ready answers 500) unless its
+# datasets were ingested from the current source files, instead of building what is
+# missing itself. This is checked at load time only; files changed after that are
+# served through the raw-CSV fallbacks.
+REQUIRE_INGEST = os.environ.get('REQUIRE_INGEST', '').lower() in ('1', 'true', 'yes')
+
+def source_signatures(paths):
+    return {path: file_signature(path) for path in paths}
+
+def read_manifest(manifest_path=MANIFEST_FILE):
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+def write_manifest(datasets, manifest_path=MANIFEST_FILE):
+    previous = read_manifest(manifest_path)
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "generation": (previous["generation"] + 1) if previous else 1,
+        "created_at": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        "datasets": datasets,
+    }
+    tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+# The manifest entry for a dataset, or None if it was never ingested or any of its
+# source files has changed since
+def ingested(name, manifest_path=MANIFEST_FILE):
+    manifest = read_manifest(manifest_path)
+    entry = manifest["datasets"].get(name) if manifest else None
+    if entry is None:
+        return None
+    for path, signature in entry["sources"].items():
+        try:
+            if file_signature(path) != signature:
+                return None
+        except OSError:
+            return None
+    return entry
+
+# Called by each service at load time
+def require_ingested(name):
+    entry = ingested(name)
+    if entry is None and REQUIRE_INGEST:
+        raise RuntimeError(f"{name} data has not been ingested from the current source files; run `python ingest.py`")
+    return entry
@@ -0,0 +1,169 @@
+import argparse
+import csv
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+import parking_violations
+import airnow_fires
+import population_multithreaded
+from airnow_catalog import catalog, load_manifest, refresh_catalog, save_manifest
+from airnow_rollups import rollup_files, rollup_path_for
+from datasets import MANIFEST_FILE, read_manifest, write_manifest, source_signatures
+from parking_store import build_column_store, get_column_store, get_fee_aggregates, store_path_for, aggregates_path_for
+from shared_arrays import load_arrays
+
+# Offline ingest: validate every raw dataset, convert it into the binary forms the
+# services read (columnar store, fee arrays and aggregates, plate index, AirNow
+# summaries, rollups and catalog, population arrays) and record the result in a
+# versioned manifest (datasets.MANIFEST_FILE). Artifacts that are already fresh are
+# reused. Run it from the high_performance directory whenever a source file changes:
+#
+#   python ingest.py                     # every dataset
+#   python ingest.py parking population  # only these
+#
+# Exits non-zero if any dataset fails validation; the others are still ingested.
+
+class SchemaError(Exception):
+    pass
+
+def read_header(path):
+    # csv.reader, not readline: the fee column names contain quoted newlines
+    with open(path, newline='') as f:
+        return next(csv.reader(f), [])
+
+def require_columns(path, required):
+    header = read_header(path)
+    missing = [col for col in required if col not in header]
+    if missing:
+        raise SchemaError(f"{path} is missing columns {missing}")
+
+def ingest_parking():
+    require_columns(parking_violations.PARKING_FILE, parking_violations.columns)
+    require_columns(parking_violations.VIOLATION_CODES_FILE,
+                    ['VIOLATION CODE'] + list(parking_violations.fee_columns.values()))
+
+    parking_violations.load_fee_tables()
+    store = get_column_store(parking_violations.PARKING_FILE)
+    if store is None:
+        build_column_store(parking_violations.PARKING_FILE, parking_violations.columns)
+        store = get_column_store(parking_violations.PARKING_FILE)
+    get_fee_aggregates(parking_violations.PARKING_FILE, store, parking_violations.fee_tables,
+                       parking_violations.fee_tables_signature)
+    index = parking_violations.get_plate_index(parking_violations.PARKING_FILE)
+    if index is None:
+        index = parking_violations.build_plate_index(parking_violations.PARKING_FILE)
+    codes = pd.read_csv(parking_violations.VIOLATION_CODES_FILE, usecols=['VIOLATION CODE'])['VIOLATION CODE']
+    violation_codes = pd.to_numeric(codes, errors='coerce').dropna().nunique()
+
+    return {
+        "sources": source_signatures([parking_violations.PARKING_FILE, parking_violations.VIOLATION_CODES_FILE]),
+        "artifacts": {
+            "column_store": store_path_for(parking_violations.PARKING_FILE),
+            "fee_aggregates": aggregates_path_for(parking_violations.PARKING_FILE),
+            "plate_index": parking_violations.index_path_for(parking_violations.PARKING_FILE),
+            "fee_tables": parking_violations.fee_tables_path_for(parking_violations.VIOLATION_CODES_FILE),
+        },
+        "stats": {
+            "rows": store["meta"]["rows"],
+            "plates": len(index["plates"]),
+            "violation_codes": int(violation_codes),
+        },
+    }
+
+def ingest_airnow():
+    load_manifest(airnow_fires.CATALOG_FILE)
+    refresh_catalog(airnow_fires.DATA_DIR, airnow_fires.CATALOG_FILE)
+    save_manifest(airnow_fires.CATALOG_FILE)
+    dates, entries = catalog["index"]
+    files = [path for date, folder, path in entries]
+
+    # The same column-count check /process_batch_csv makes, for every file up front
+    bad_files = []
+    for file in files:
+        with open(file, newline='') as f:
+            first_line = f.readline()
+        if first_line and len(next(csv.reader([first_line]))) != len(airnow_fires.expected_headers):
+            bad_files.append(file)
+    if bad_files:
+        raise SchemaError(f"{len(bad_files)} AirNow files do not have {len(airnow_fires.expected_headers)} "
+                          f"columns, e.g. {bad_files[:5]}")
+
+    chunk_rows = airnow_fires.chunk_rows_for(airnow_fires.MEMORY_CEILING_MB, airnow_fires.max_workers)
+    readings = 0
+    for file, summary in airnow_fires.iter_file_summaries(files, airnow_fires.max_workers, chunk_rows):
+        readings += summary["aqi_count"]
+    rollup = rollup_files(files, airnow_fires.expected_headers, airnow_fires.executor)
+
+    return {
+        "sources": source_signatures(files),
+        "artifacts": {
+            "catalog": airnow_fires.CATALOG_FILE,
+            "summaries": [airnow_fires.summary_path_for(file) for file in files],
+            "rollups": [rollup_path_for(file) for file in files],
+        },
+        "stats": {
+            "files": len(files),
+            "first_date": dates[0] if dates else None,
+            "last_date": dates[-1] if dates else None,
+            "valid_aqi_readings": readings,
+            "sites": int(rollup['site'].nunique()),
+        },
+    }
+
+def ingest_population():
+    population_file = population_multithreaded.POPULATION_FILE
+    require_columns(population_file, ['Country Name', 'Country Code'] + population_multithreaded.years)
+
+    arrays, meta = load_arrays(population_multithreaded.POPULATION_ARRAYS, population_file)
+    if arrays is None:
+        population_multithreaded.build_population_arrays()
+        arrays, meta = load_arrays(population_multithreaded.POPULATION_ARRAYS, population_file)
+
+    return {
+        "sources": source_signatures([population_file]),
+        "artifacts": {"arrays": population_multithreaded.POPULATION_ARRAYS},
+        "stats": {
+            "countries": len(meta["country_names"]),
+            "years": len(population_multithreaded.years),
+            "missing_values": int(np.isnan(arrays["population_matrix"]).sum()),
+        },
+    }
+
+DATASETS = {
+    "parking": ingest_parking,
+    "airnow": ingest_airnow,
+    "population": ingest_population,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate and precompile the service datasets")
+    parser.add_argument('datasets', nargs='*', help=f"any of {list(DATASETS)} (default: all)")
+    args = parser.parse_args()
+    unknown = [name for name in args.datasets if name not in DATASETS]
+    if unknown:
+        parser.error(f"unknown datasets {unknown}; choose from {list(DATASETS)}")
+
+    manifest = read_manifest()
+    datasets = dict(manifest["datasets"]) if manifest else {}
+    failed = False
+    for name in args.datasets or list(DATASETS):
+        start_time = time.perf_counter()
+        try:
+            entry = DATASETS[name]()
+        except (SchemaError, OSError) as e:
+            print(f"{name}: {e}", file=sys.stderr)
+            datasets.pop(name, None)
+            failed = True
+            continue
+        entry["ingest_seconds"] = time.perf_counter() - start_time
+        datasets[name] = entry
+        print(f"{name}: {entry['stats']} in {entry['ingest_seconds']:.1f}s")
+
+    manifest = write_manifest(datasets)
+    print(f"wrote {MANIFEST_FILE} (generation {manifest['generation']})")
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
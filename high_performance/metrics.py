@@ -0,0 +1,150 @@
+import cProfile
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from flask import Response, g, request
+
+# In-process metrics for one service: per-stage and per-request latency histograms plus
+# rows/bytes counters, served in the Prometheus text format at /metrics.
+#
+# Setting PROFILE_SLOW_MS profiles sampled requests (PROFILE_SAMPLE_RATE, default all of
+# them, one at a time) with cProfile and writes the stats of those slower than the
+# threshold to PROFILE_DIR, for `python -m pstats` or snakeviz.
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+PROFILE_SLOW_MS = float(os.environ.get('PROFILE_SLOW_MS', 0))
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 1.0))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels) + '}'
+
+class Metrics:
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.histograms = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+            i = bisect_left(BUCKETS, seconds)
+            if i < len(BUCKETS):
+                histogram["buckets"][i] += 1
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+
+    def count(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    # Time a block of work as one observation of stage_seconds{stage=...}
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('stage_seconds', time.perf_counter() - start, stage=stage)
+
+    # Rows and bytes handled by a stage
+    def processed(self, stage, rows=0, nbytes=0):
+        if rows:
+            self.count('rows_total', rows, stage=stage)
+        if nbytes:
+            self.count('bytes_total', nbytes, stage=stage)
+
+    def render(self):
+        with self.lock:
+            histograms = {key: {**value, "buckets": list(value["buckets"])} for key, value in self.histograms.items()}
+            counters = dict(self.counters)
+
+        lines = []
+        for name in sorted({name for name, _ in histograms}):
+            metric = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {metric} histogram")
+            for (key_name, labels), histogram in sorted(histograms.items()):
+                if key_name != name:
+                    continue
+                cumulative = 0
+                for bound, bucket in zip(BUCKETS, histogram["buckets"]):
+                    cumulative += bucket
+                    lines.append(f"{metric}_bucket{format_labels(labels + (('le', bound),))} {cumulative}")
+                lines.append(f"{metric}_bucket{format_labels(labels + (('le', '+Inf'),))} {histogram['count']}")
+                lines.append(f"{metric}_sum{format_labels(labels)} {histogram['sum']}")
+                lines.append(f"{metric}_count{format_labels(labels)} {histogram['count']}")
+        for name in sorted({name for name, _ in counters}):
+            metric = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {metric} counter")
+            for (key_name, labels), value in sorted(counters.items()):
+                if key_name == name:
+                    lines.append(f"{metric}{format_labels(labels)} {value}")
+        return '\n'.join(lines) + '\n'
+
+# cProfile allows one active profiler at a time, so at most one request is profiled
+profile_lock = threading.Lock()
+
+def start_profile():
+    if PROFILE_SLOW_MS <= 0 or random.random() >= PROFILE_SAMPLE_RATE or not profile_lock.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        profile_lock.release()
+        return None
+    return profiler
+
+def finish_profile(metrics, profiler, elapsed):
+    profiler.disable()
+    try:
+        if elapsed * 1000 >= PROFILE_SLOW_MS:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            endpoint = request.endpoint or 'unknown'
+            profiler.dump_stats(os.path.join(PROFILE_DIR, f"{metrics.prefix}-{endpoint}-{time.time_ns()}.prof"))
+            metrics.count('slow_request_profiles_total', endpoint=endpoint)
+    finally:
+        profile_lock.release()
+
+# Record latency, status and response size of every request and add the /metrics route.
+# Install before readiness so time spent waiting for the data load is included.
+def install_metrics(app, prefix):
+    metrics = Metrics(prefix)
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_start = time.perf_counter()
+        g.profiler = start_profile()
+
+    @app.after_request
+    def record_request(response):
+        if 'metrics_start' in g and request.endpoint != 'metrics':
+            endpoint = request.endpoint or 'unknown'
+            metrics.observe('request_seconds', time.perf_counter() - g.metrics_start, endpoint=endpoint)
+            metrics.count('requests_total', endpoint=endpoint, status=response.status_code)
+            if not response.is_streamed:
+                metrics.count('response_bytes_total', response.calculate_content_length() or 0, endpoint=endpoint)
+        return response
+
+    @app.teardown_request
+    def stop_profile(exc):
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            finish_profile(metrics, profiler, time.perf_counter() - g.metrics_start)
+
+    @app.route('/metrics', methods=['GET'], endpoint='metrics')
+    def metrics_endpoint():
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+    return metrics
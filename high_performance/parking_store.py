@@ -0,0 +1,230 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from shared_arrays import file_signature, make_tmp_dir, publish_dir, read_meta, save_arrays
+
+# Columnar on-disk copy of the parking violations CSV: one memory-mapped array per
+# column, with string columns dictionary-encoded into int32 codes
+INT_COLUMNS = ["Summons Number", "Violation Code"]
+STRING_COLUMNS = ["Plate ID", "Registration State", "Issue Date", "Street Name", "Violation Description"]
+
+# Stored in an int column where the CSV value is missing or not a number; read back as NaN
+INT_NULL = np.iinfo(np.int64).min
+
+# Bumped whenever the on-disk layout changes, so older stores are rebuilt
+STORE_VERSION = 3
+
+# Stores currently opened, keyed by CSV path
+column_stores = {}
+
+def store_path_for(file_path):
+    return file_path + '.columns'
+
+def column_file(column):
+    return column.lower().replace(' ', '_')
+
+# Convert the CSV into the columnar store in one chunked pass
+def build_column_store(file_path, columns, chunksize=2 * 10**6):
+    signature = file_signature(file_path)
+    store_path = store_path_for(file_path)
+    tmp_path = make_tmp_dir(store_path)
+    # Keep the CSV's column order, which the index and scan paths return as well
+    header = list(pd.read_csv(file_path, nrows=0).columns)
+    missing = [col for col in columns if col not in header]
+    if missing:
+        raise ValueError(f"{file_path} is missing columns {missing}")
+    columns = [col for col in header if col in columns]
+
+    string_columns = [col for col in columns if col in STRING_COLUMNS]
+    int_columns = [col for col in columns if col not in STRING_COLUMNS]
+    dictionaries = {col: {} for col in string_columns}
+    outputs = {col: open(os.path.join(tmp_path, column_file(col) + '.bin'), 'wb') for col in columns}
+    rows = 0
+
+    try:
+        reader = pd.read_csv(file_path, usecols=columns, chunksize=chunksize,
+                             dtype={col: str for col in string_columns})
+        for chunk in reader:
+            for col in int_columns:
+                values = pd.to_numeric(chunk[col], errors='coerce').fillna(INT_NULL).astype(np.int64)
+                values.to_numpy().tofile(outputs[col])
+
+            for col in string_columns:
+                # Factorize the chunk, then map its local codes onto the global dictionary
+                codes, uniques = pd.factorize(chunk[col])
+                dictionary = dictionaries[col]
+                mapping = np.array([dictionary.setdefault(value, len(dictionary)) for value in uniques],
+                                   dtype=np.int32)
+                global_codes = np.full(len(codes), -1, dtype=np.int32)
+                valid = codes >= 0
+                global_codes[valid] = mapping[codes[valid]]
+                global_codes.tofile(outputs[col])
+
+            rows += len(chunk)
+    finally:
+        for output in outputs.values():
+            output.close()
+
+    for col in string_columns:
+        values = np.array([value.encode('utf-8') for value in dictionaries[col]], dtype='S')
+        np.save(os.path.join(tmp_path, column_file(col) + '.values.npy'), values)
+        # Sort permutation so a value's code can be found with a binary search
+        np.save(os.path.join(tmp_path, column_file(col) + '.order.npy'), np.argsort(values, kind='stable'))
+
+    meta = {
+        "version": STORE_VERSION,
+        "rows": rows,
+        "source_signature": signature,
+        "columns": {col: ("int32" if col in string_columns else "int64") for col in columns},
+        "dictionary_columns": string_columns,
+    }
+    with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+
+    publish_dir(tmp_path, store_path)
+    return open_column_store(file_path)
+
+# Open the store memory-mapped; stale stores (CSV size/mtime or STORE_VERSION changed) are refused
+def open_column_store(file_path):
+    store_path = store_path_for(file_path)
+    meta = read_meta(store_path)
+    if meta is None or meta.get("version") != STORE_VERSION or meta["source_signature"] != file_signature(file_path):
+        return None
+
+    store = {"meta": meta, "codes": {}, "values": {}, "order": {}}
+    try:
+        for col, dtype in meta["columns"].items():
+            store["codes"][col] = np.memmap(os.path.join(store_path, column_file(col) + '.bin'),
+                                            dtype=dtype, mode='r', shape=(meta["rows"],))
+        for col in meta["dictionary_columns"]:
+            store["values"][col] = np.load(os.path.join(store_path, column_file(col) + '.values.npy'), mmap_mode='r')
+            store["order"][col] = np.load(os.path.join(store_path, column_file(col) + '.order.npy'), mmap_mode='r')
+    except FileNotFoundError:
+        return None
+    return store
+
+def get_column_store(file_path):
+    signature = file_signature(file_path)
+    cached = column_stores.get(file_path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    store = open_column_store(file_path)
+    if store is not None:
+        column_stores[file_path] = (signature, store)
+    return store
+
+# Dictionary code of `value` in a string column, or -1 if it never occurs
+def lookup_code(store, column, value):
+    values = store["values"][column]
+    order = store["order"][column]
+    key = value.encode('utf-8')
+    i = np.searchsorted(values, key, sorter=order)
+    if i < len(order) and values[order[i]] == key:
+        return int(order[i])
+    return -1
+
+# Decode the selected rows of every column into a DataFrame
+def materialize_rows(store, rows):
+    data = {}
+    for col in store["meta"]["columns"]:
+        codes = np.asarray(store["codes"][col][rows])
+        if col in store["values"]:
+            decoded = np.full(len(codes), None, dtype=object)
+            valid = codes >= 0
+            decoded[valid] = np.char.decode(store["values"][col][codes[valid]], 'utf-8')
+            data[col] = decoded
+        else:
+            nulls = codes == INT_NULL
+            if nulls.any():
+                codes = codes.astype(np.float64)
+                codes[nulls] = np.nan
+            data[col] = codes
+    return pd.DataFrame(data)
+
+# Only the Plate ID codes are read to find matches; other columns are touched for matching rows only
+def find_plate_rows(store, plate_numbers):
+    codes = [lookup_code(store, "Plate ID", plate) for plate in plate_numbers]
+    codes = [code for code in codes if code >= 0]
+    if not codes:
+        return np.empty(0, dtype=np.int64)
+    if len(codes) == 1:
+        return np.flatnonzero(store["codes"]["Plate ID"] == codes[0])
+    return np.flatnonzero(np.isin(store["codes"]["Plate ID"], codes))
+
+# Fee of every row's violation code; codes missing from the table cost 0
+def gather_fees(fee_table, violation_codes):
+    fees = np.zeros(len(violation_codes), dtype=fee_table.dtype)
+    in_table = (violation_codes >= 0) & (violation_codes < len(fee_table))
+    fees[in_table] = fee_table[violation_codes[in_table]]
+    return fees
+
+def aggregates_path_for(file_path):
+    return os.path.join(store_path_for(file_path), 'aggregates')
+
+# Materialize violation counts and fee totals per plate and per registration state,
+# plus the plates with the highest totals, from one pass over the stored columns
+def build_fee_aggregates(file_path, store, fee_tables, fees_signature, top_n=1000):
+    violation_codes = np.asarray(store["codes"]["Violation Code"])
+    row_fees = {fee_type: gather_fees(table, violation_codes) for fee_type, table in fee_tables.items()}
+
+    arrays = {}
+    for col in ["Plate ID", "Registration State"]:
+        codes = np.asarray(store["codes"][col])
+        valid = codes >= 0
+        size = len(store["values"][col])
+        arrays[column_file(col) + '.count'] = np.bincount(codes[valid], minlength=size)
+        for fee_type, fees in row_fees.items():
+            totals = np.bincount(codes[valid], weights=fees[valid], minlength=size).astype(fees.dtype)
+            arrays[column_file(col) + '.' + fee_type.lower()] = totals
+            if col == "Plate ID":
+                arrays['top.' + fee_type.lower()] = np.argsort(-totals, kind='stable')[:top_n]
+
+    meta = {"fees_signature": fees_signature, "fee_types": list(fee_tables), "top_n": top_n}
+    save_arrays(aggregates_path_for(file_path), arrays, meta)
+    return open_fee_aggregates(file_path, fees_signature)
+
+# Aggregates live inside the store, so a rebuilt store drops them; a changed fee table
+# (violation codes file size/mtime) makes them stale as well
+def open_fee_aggregates(file_path, fees_signature):
+    aggregates_path = aggregates_path_for(file_path)
+    meta = read_meta(aggregates_path)
+    if meta is None or meta["fees_signature"] != fees_signature:
+        return None
+
+    aggregates = {"meta": meta}
+    try:
+        for name in os.listdir(aggregates_path):
+            if name.endswith('.npy'):
+                aggregates[name[:-len('.npy')]] = np.load(os.path.join(aggregates_path, name), mmap_mode='r')
+    except FileNotFoundError:
+        return None
+    return aggregates
+
+def get_fee_aggregates(file_path, store, fee_tables, fees_signature):
+    aggregates = store.get("aggregates")
+    if aggregates is not None and aggregates["meta"]["fees_signature"] == fees_signature:
+        return aggregates
+    aggregates = open_fee_aggregates(file_path, fees_signature)
+    if aggregates is None:
+        aggregates = build_fee_aggregates(file_path, store, fee_tables, fees_signature)
+    store["aggregates"] = aggregates
+    return aggregates
+
+# Violation count and fee totals for one plate or registration state, or None if unseen
+def fee_totals(store, aggregates, column, value):
+    code = lookup_code(store, column, value)
+    if code < 0:
+        return None
+    prefix = column_file(column)
+    totals = {"Violations": aggregates[prefix + '.count'][code].item()}
+    for fee_type in aggregates["meta"]["fee_types"]:
+        totals[fee_type + " Fee"] = aggregates[prefix + '.' + fee_type.lower()][code].item()
+    return totals
+
+def top_plates(store, aggregates, fee_type, n):
+    results = []
+    for code in aggregates['top.' + fee_type.lower()][:n]:
+        plate = store["values"]["Plate ID"][code].decode('utf-8')
+        results.append({"Plate ID": plate, **fee_totals(store, aggregates, "Plate ID", plate)})
+    return results
@@ -1,50 +1,289 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
+from collections import deque
 import pandas as pd
+import numpy as np
 from concurrent.futures import ProcessPoolExecutor
+import csv
+import io
 import os
+import sys
+import threading
+from readiness import install_readiness
+from datasets import PARKING_FILE, VIOLATION_CODES_FILE, require_ingested
+from metrics import install_metrics
+from serialization import requested_format, format_error, frame_response
+from shared_arrays import file_signature, load_arrays, save_arrays
+from result_cache import ResultCache, cached_response, add_cache_stats_route
+from parking_store import (build_column_store, get_column_store, find_plate_rows, materialize_rows,
+                           gather_fees, get_fee_aggregates, fee_totals, top_plates)
 
 app = Flask(__name__)
+metrics = install_metrics(app, 'parking_violations')
 
-violation_codes_df = pd.read_csv('../DATA/data_export/ParkingViolationCodes_January2020.csv')
-violation_fees = violation_codes_df.set_index('VIOLATION CODE').to_dict(orient='index')
+fee_columns = {
+    "Manhattan": "Manhattan  96th St. & below\n(Fine Amount $)",
+    "Base": "All Other Areas\n(Fine Amount $)",
+}
+
+# Dense fee array indexed by violation code; codes missing from the table cost 0
+def build_fee_table(codes_df, fee_column):
+    codes = pd.to_numeric(codes_df['VIOLATION CODE'], errors='coerce')
+    fees = pd.to_numeric(codes_df[fee_column], errors='coerce').fillna(0)
+    valid = codes.notna() & (codes >= 0)
+    codes, fees = codes[valid].astype(np.int64), fees[valid]
+
+    dtype = np.int64 if (fees % 1 == 0).all() else np.float64
+    table = np.zeros(codes.max() + 1 if len(codes) else 1, dtype=dtype)
+    table[codes.to_numpy()] = fees.to_numpy(dtype=dtype)
+    return table
+
+# Fee arrays memory-mapped from a directory built once from the codes CSV, so every
+# worker process shares one copy instead of parsing the table into its own DataFrame
+def fee_tables_path_for(codes_file):
+    return codes_file + '.fee_tables'
+
+def build_fee_tables(codes_file):
+    codes_df = pd.read_csv(codes_file)
+    tables = {fee_type: build_fee_table(codes_df, column) for fee_type, column in fee_columns.items()}
+    save_arrays(fee_tables_path_for(codes_file), tables, {"source_signature": file_signature(codes_file)})
+
+# Filled in by load_fee_tables, which runs in the background after startup
+fee_tables = {}
+fee_tables_signature = None
+
+def load_fee_tables():
+    global fee_tables, fee_tables_signature
+    tables, meta = load_arrays(fee_tables_path_for(VIOLATION_CODES_FILE), VIOLATION_CODES_FILE)
+    if tables is None:
+        build_fee_tables(VIOLATION_CODES_FILE)
+        tables, meta = load_arrays(fee_tables_path_for(VIOLATION_CODES_FILE), VIOLATION_CODES_FILE)
+    fee_tables = {fee_type: tables[fee_type] for fee_type in fee_columns}
+    fee_tables_signature = meta["source_signature"]
+
+# Vectorized gather of the fee for every violation code
+def lookup_fees(fee_table, violation_codes):
+    codes = pd.to_numeric(pd.Series(violation_codes), errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+    return gather_fees(fee_table, codes)
+
+columns = [
+    "Summons Number", "Plate ID", "Registration State", "Issue Date",
+    "Street Name", "Violation Code", "Violation Description"
+]
 
 max_workers = 10
 executor = ProcessPoolExecutor(max_workers=max_workers)
 
-def process_chunk(chunk, plate_number):
-    filtered_chunk = chunk[chunk["Plate ID"] == plate_number]
-    return filtered_chunk
-
-def search_parking_violations(file_path, plate_number):
-    columns = [
-        "Summons Number", "Plate ID", "Registration State", "Issue Date",
-        "Street Name", "Violation Code", "Violation Description"
-    ]
-    
-    chunksize = 2 * 10**6
+# Bytes parsed per scan step and rows materialized per streamed batch
+block_size = 64 * 2**20
+stream_batch_rows = 50000
+
+# Plate index currently in memory, keyed by the CSV stat it was built from
+plate_index = {}
+
+# Directory of .npy arrays, memory-mapped on load so worker processes share its pages
+def index_path_for(file_path):
+    return file_path + '.plate_index'
+
+# One pass over the CSV recording the byte offset of every row, grouped by plate
+def build_plate_index(file_path):
+    signature = file_signature(file_path)
+    batch_size = 10**6
+    plate_batches, offset_batches = [], []
+    plates, offsets = [], []
+
+    with open(file_path, 'rb') as f:
+        header = f.readline()
+        plate_col = next(csv.reader([header.decode('utf-8')])).index("Plate ID")
+        offset = len(header)
+        for line in f:
+            if b'"' in line:
+                fields = next(csv.reader([line.decode('utf-8', 'replace')]))
+                plate = fields[plate_col].encode('utf-8') if len(fields) > plate_col else b''
+            else:
+                fields = line.split(b',', plate_col + 1)
+                plate = fields[plate_col] if len(fields) > plate_col else b''
+            plates.append(plate)
+            offsets.append(offset)
+            offset += len(line)
+            if len(plates) == batch_size:
+                plate_batches.append(np.array(plates, dtype='S'))
+                offset_batches.append(np.array(offsets, dtype=np.int64))
+                plates, offsets = [], []
+
+    plate_batches.append(np.array(plates, dtype='S'))
+    offset_batches.append(np.array(offsets, dtype=np.int64))
+    all_plates = np.concatenate(plate_batches)
+    all_offsets = np.concatenate(offset_batches)
+
+    # Stable sort keeps each plate's rows in file order
+    order = np.argsort(all_plates, kind='stable')
+    sorted_plates = all_plates[order]
+    unique_plates, starts = np.unique(sorted_plates, return_index=True)
+    starts = np.append(starts, len(sorted_plates)).astype(np.int64)
+
+    index = {
+        "plates": unique_plates,
+        "starts": starts,
+        "offsets": all_offsets[order],
+    }
+    save_arrays(index_path_for(file_path), index, {"source_signature": signature})
+    return index
+
+# Attach the sidecar index, refusing it (None) when the CSV size or mtime has changed
+def get_plate_index(file_path):
+    signature = file_signature(file_path)
+    if plate_index.get("signature") == signature:
+        return plate_index["index"]
+
+    index, _ = load_arrays(index_path_for(file_path), file_path)
+    if index is None:
+        return None
+
+    plate_index["signature"] = signature
+    plate_index["index"] = index
+    return index
+
+def lookup_plate_offsets(index, plate_numbers):
+    plates = index["plates"]
+    matches = [index["offsets"][:0]]
+    for plate_number in plate_numbers:
+        plate = plate_number.encode('utf-8')
+        i = np.searchsorted(plates, plate)
+        if i < len(plates) and plates[i] == plate:
+            matches.append(index["offsets"][index["starts"][i]:index["starts"][i + 1]])
+    # Read in file order so the seeks move forward through the file
+    return np.sort(np.concatenate(matches))
+
+def read_rows_at(file_path, offsets):
+    with open(file_path, 'rb') as f:
+        lines = [f.readline()]
+        for offset in offsets:
+            f.seek(offset)
+            lines.append(f.readline())
+    return pd.read_csv(io.BytesIO(b''.join(lines)), usecols=columns, dtype={"Plate ID": str})
+
+# Split the file body into byte ranges of at most about `block_size` bytes
+# (and at least `parts` ranges) that each start on a line boundary
+def split_byte_ranges(file_path, parts):
+    size = os.path.getsize(file_path)
+    parts = max(parts, -(-size // block_size))
+    with open(file_path, 'rb') as f:
+        header = f.readline()
+        body_start = len(header)
+        boundaries = [body_start]
+        for i in range(1, parts):
+            f.seek(max(body_start + (size - body_start) * i // parts - 1, boundaries[-1]))
+            f.readline()
+            if f.tell() > boundaries[-1] and f.tell() < size:
+                boundaries.append(f.tell())
+    boundaries.append(size)
+    return header, list(zip(boundaries[:-1], boundaries[1:]))
+
+# Runs in a worker: parse and filter one byte range, returning only the matching rows
+def scan_byte_range(file_path, header, start, end, plate_numbers):
     results = []
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        pos = start
+        while pos < end:
+            data = f.read(min(block_size, end - pos))
+            if not data:
+                break
+            # Finish the partial last line; `end` is a line start so this never crosses it
+            if f.tell() < end:
+                data += f.readline()
+            pos = f.tell()
+            chunk = pd.read_csv(io.BytesIO(header + data), usecols=columns, dtype={"Plate ID": str})
+            results.append(chunk[chunk["Plate ID"].isin(plate_numbers)])
+
+    if not results:
+        return pd.read_csv(io.BytesIO(header), usecols=columns, dtype={"Plate ID": str})
+    return pd.concat(results)
+
+# Yield each range's matches in file order, keeping at most `parts` ranges in flight
+def scan_parking_violations(file_path, plate_numbers, parts=max_workers):
+    header, ranges = split_byte_ranges(file_path, parts)
+    pending = deque()
+
+    for start, end in ranges:
+        pending.append(executor.submit(scan_byte_range, file_path, header, start, end, plate_numbers))
+        if len(pending) >= parts:
+            yield pending.popleft().result()
+
+    while pending:
+        yield pending.popleft().result()
+
+# Prefer the columnar store, then the plate index, then a full parallel scan.
+# Any number of plates is answered with a single pass over the data, yielded in
+# batches (with fees) so callers can stream without holding every match.
+def iter_parking_violations(file_path, plate_numbers, parts=max_workers):
+    with metrics.timer('lookup'):
+        store = get_column_store(file_path)
+        index = get_plate_index(file_path) if store is None else None
+        if store is not None:
+            rows = find_plate_rows(store, plate_numbers)
+        elif index is not None:
+            offsets = lookup_plate_offsets(index, plate_numbers)
 
-    futures = []
-    for chunk in pd.read_csv(file_path, usecols=columns, chunksize=chunksize):
-        futures.append(executor.submit(process_chunk, chunk, plate_number))
+    if store is not None:
+        stage = 'store_read'
+        batches = (materialize_rows(store, rows[i:i + stream_batch_rows])
+                   for i in range(0, max(len(rows), 1), stream_batch_rows))
+    elif index is not None:
+        stage = 'index_read'
+        batches = (read_rows_at(file_path, offsets[i:i + stream_batch_rows])
+                   for i in range(0, max(len(offsets), 1), stream_batch_rows))
+    else:
+        stage = 'scan'
+        metrics.processed(stage, nbytes=os.path.getsize(file_path))
+        batches = scan_parking_violations(file_path, plate_numbers, parts)
 
-    for future in futures:
-        results.append(future.result())
+    while True:
+        with metrics.timer(stage):
+            result_df = next(batches, None)
+        if result_df is None:
+            break
+        metrics.processed(stage, rows=len(result_df))
+        with metrics.timer('fee_join'):
+            result_df = add_fees(result_df)
+        yield result_df
 
-    result_df = pd.concat(results)
-    
-    result_df["Manhattan Fee"] = result_df["Violation Code"].apply(lambda code: calculate_fee(code, "Manhattan"))
-    result_df["Base Fee"] = result_df["Violation Code"].apply(lambda code: calculate_fee(code, "Base"))
+def search_parking_violations(file_path, plate_numbers, parts=max_workers):
+    return pd.concat(list(iter_parking_violations(file_path, plate_numbers, parts)))
 
+def add_fees(result_df):
+    result_df["Manhattan Fee"] = lookup_fees(fee_tables["Manhattan"], result_df["Violation Code"])
+    result_df["Base Fee"] = lookup_fees(fee_tables["Base"], result_df["Violation Code"])
     return result_df
 
 def calculate_fee(violation_code, fee_type):
-    fee_info = violation_fees.get(violation_code, {})
-    if fee_type == "Manhattan":
-        return fee_info.get("Manhattan  96th St. & below\n(Fine Amount $)", 0)
-    elif fee_type == "Base":
-        return fee_info.get("All Other Areas\n(Fine Amount $)", 0)
-    return 0
+    if fee_type not in fee_tables:
+        return 0
+    return lookup_fees(fee_tables[fee_type], [violation_code])[0]
+
+# NDJSON streaming is requested with ?stream=1 or an application/x-ndjson Accept header
+def wants_stream():
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return request.accept_mimetypes.best == 'application/x-ndjson'
+
+# One JSON record per line, written as soon as each batch of matches is ready
+def stream_records(file_path, plate_numbers, parts):
+    def generate():
+        for result_df in iter_parking_violations(file_path, plate_numbers, parts):
+            if len(result_df):
+                with metrics.timer('serialize'):
+                    lines = result_df.to_json(orient='records', lines=True)
+                metrics.processed('serialize', nbytes=len(lines))
+                yield lines if lines.endswith('\n') else lines + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+# Search results are cached per plate list (the max_workers split does not change the
+# answer); a new version of either CSV changes every key. Streams are never cached.
+result_cache = ResultCache()
+result_sources = [PARKING_FILE, VIOLATION_CODES_FILE]
+add_cache_stats_route(app, result_cache)
 
 @app.route('/search', methods=['GET'])
 def search():
@@ -52,10 +291,133 @@ def search():
     if not plate_number:
         return jsonify({"error": "plate_number parameter is required"}), 400
 
-    file_path = '../DATA/data_export/Parking_Violations_Issued_2022.csv'
-    result_df = search_parking_violations(file_path, plate_number)
-    result = result_df.to_dict(orient='records')
-    return jsonify(result)
+    # Number of byte ranges for the full-scan fallback
+    parts = request.args.get('max_workers', default=max_workers, type=int)
+    if parts < 1:
+        return jsonify({"error": "max_workers must be a positive integer"}), 400
+
+    if wants_stream():
+        return stream_records(PARKING_FILE, [plate_number], parts)
+
+    fmt = requested_format()
+    error = format_error(fmt)
+    if error:
+        return error
+
+    def build():
+        result_df = search_parking_violations(PARKING_FILE, [plate_number], parts)
+        with metrics.timer('serialize'):
+            return frame_response(result_df, fmt, lambda: jsonify(result_df.to_dict(orient='records')))
+
+    return cached_response(result_cache, ('search', plate_number, fmt), result_sources, build)
+
+# Plates come from a JSON body {"plate_numbers": [...]} or repeated plate_number parameters
+@app.route('/search/batch', methods=['GET', 'POST'])
+def search_batch():
+    if request.method == 'POST':
+        body = request.get_json(silent=True) or {}
+        plate_numbers = body.get('plate_numbers') if isinstance(body, dict) else body
+    else:
+        plate_numbers = request.args.getlist('plate_number')
+
+    if not plate_numbers or not isinstance(plate_numbers, list) or \
+            not all(isinstance(plate, str) and plate for plate in plate_numbers):
+        return jsonify({"error": "a non-empty list of plate_number values is required"}), 400
+    plate_numbers = list(dict.fromkeys(plate_numbers))
+
+    parts = request.args.get('max_workers', default=max_workers, type=int)
+    if parts < 1:
+        return jsonify({"error": "max_workers must be a positive integer"}), 400
+
+    if wants_stream():
+        return stream_records(PARKING_FILE, plate_numbers, parts)
+
+    # The columns and arrow formats return one flat table; rows carry their Plate ID
+    fmt = requested_format()
+    error = format_error(fmt)
+    if error:
+        return error
+
+    def records(result_df):
+        result = {plate: [] for plate in plate_numbers}
+        for plate, group in result_df.groupby("Plate ID", sort=False):
+            result[plate] = group.to_dict(orient='records')
+        return jsonify(result)
+
+    def build():
+        result_df = search_parking_violations(PARKING_FILE, plate_numbers, parts)
+        with metrics.timer('serialize'):
+            return frame_response(result_df, fmt, lambda: records(result_df))
+
+    return cached_response(result_cache, ('search/batch', tuple(plate_numbers), fmt), result_sources, build)
+
+# Fee tables first, then open whichever search structure is available so the first
+# search does not pay for it
+def load_data():
+    require_ingested('parking')
+    load_fee_tables()
+    if get_column_store(PARKING_FILE) is None:
+        get_plate_index(PARKING_FILE)
+
+start_loading = install_readiness(app, load_data)
+
+# Fee endpoints read aggregates materialized from the columnar store
+def load_fee_aggregates():
+    store = get_column_store(PARKING_FILE)
+    if store is None:
+        return None, None
+    return store, get_fee_aggregates(PARKING_FILE, store, fee_tables, fee_tables_signature)
+
+missing_store_error = {"error": "columnar store not built; run `python parking_violations.py ingest`"}
+
+@app.route('/fees/plate/<plate_number>', methods=['GET'])
+def get_fees_by_plate(plate_number):
+    store, aggregates = load_fee_aggregates()
+    if store is None:
+        return jsonify(missing_store_error), 503
+
+    totals = fee_totals(store, aggregates, "Plate ID", plate_number)
+    if totals is None:
+        return jsonify({"error": "Plate not found"}), 404
+    return jsonify({"Plate ID": plate_number, **totals})
+
+@app.route('/fees/state/<state>', methods=['GET'])
+def get_fees_by_state(state):
+    store, aggregates = load_fee_aggregates()
+    if store is None:
+        return jsonify(missing_store_error), 503
+
+    totals = fee_totals(store, aggregates, "Registration State", state)
+    if totals is None:
+        return jsonify({"error": "Registration State not found"}), 404
+    return jsonify({"Registration State": state, **totals})
+
+@app.route('/fees/top', methods=['GET'])
+def get_top_plates():
+    n = request.args.get('n', default=10, type=int)
+    fee_type = request.args.get('fee_type', default='Base')
+    if fee_type not in fee_tables:
+        return jsonify({"error": f"fee_type must be one of {list(fee_tables)}"}), 400
+
+    store, aggregates = load_fee_aggregates()
+    if store is None:
+        return jsonify(missing_store_error), 503
+    if n < 1 or n > aggregates["meta"]["top_n"]:
+        return jsonify({"error": f"n must be between 1 and {aggregates['meta']['top_n']}"}), 400
+    return jsonify(top_plates(store, aggregates, fee_type, n))
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    # `python parking_violations.py ingest` converts the CSV into the columnar store
+    # and materializes the fee aggregates from it
+    if sys.argv[1:] == ['ingest']:
+        load_fee_tables()
+        store = build_column_store(PARKING_FILE, columns)
+        get_fee_aggregates(PARKING_FILE, store, fee_tables, fee_tables_signature)
+        sys.exit(0)
+
+    start_loading()
+    # Stale or missing indexes are refused at request time (searches fall back to the
+    # parallel scan), so rebuild in the background rather than delaying startup
+    if get_column_store(PARKING_FILE) is None and get_plate_index(PARKING_FILE) is None:
+        threading.Thread(target=build_plate_index, args=(PARKING_FILE,), daemon=True).start()
+    app.run(debug=True)
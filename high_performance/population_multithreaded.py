@@ -1,46 +1,197 @@
 from flask import Flask, jsonify, request
 import pandas as pd
+import numpy as np
 import time
+import json
 from concurrent.futures import ThreadPoolExecutor
 from concurrent.futures import ProcessPoolExecutor
+from readiness import install_readiness
+from datasets import POPULATION_FILE, require_ingested
+from metrics import install_metrics
+from shared_arrays import file_signature, load_arrays, save_arrays
+from result_cache import ResultCache, cached_response, add_cache_stats_route
 
 app = Flask(__name__)
+metrics = install_metrics(app, 'population')
 
-df = pd.read_csv('../DATA/API_SP.POP.TOTL_DS2_en_csv_v2_3401680/API_SP.POP.TOTL_DS2_en_csv_v2_3401680.csv')
-df = df[['Country Name', 'Country Code'] + [str(year) for year in range(1960, 2022)]]
+years = [str(year) for year in range(1960, 2022)]
+year_index = {year: i for i, year in enumerate(years)}
 
-executor = ThreadPoolExecutor(max_workers=4)
+# Read-only arrays shared by every worker process: built once from the CSV into this
+# directory and memory-mapped, so extra workers share the same pages instead of copying them
+POPULATION_ARRAYS = POPULATION_FILE + '.arrays'
+
+# Filled in by load_population, which runs in the background after startup
+country_names = []
+country_index = {}
+code_index = {}
+population_matrix = country_totals = year_totals = prefix_sums = None
+
+def build_population_arrays():
+    data = pd.read_csv(POPULATION_FILE)
+    data = data[['Country Name', 'Country Code'] + years]
+    matrix = data[years].to_numpy(dtype=np.float64)
+
+    # Cumulative sums with a leading zero column: the total over years a..b (inclusive,
+    # as column positions) is prefix_sums[row, b + 1] - prefix_sums[row, a]
+    arrays = {
+        "population_matrix": matrix,
+        "prefix_sums": np.concatenate([np.zeros((len(matrix), 1)), np.nancumsum(matrix, axis=1)], axis=1),
+        "country_totals": np.nansum(matrix, axis=1),
+        "year_totals": np.nansum(matrix, axis=0),
+    }
+    meta = {
+        "source_signature": file_signature(POPULATION_FILE),
+        "country_names": [str(name) for name in data['Country Name']],
+        "country_codes": [str(code) for code in data['Country Code']],
+    }
+    save_arrays(POPULATION_ARRAYS, arrays, meta)
+
+# Indexed store attached at load: hash maps on the normalized country name and on
+# Country Code, a dense country x year matrix, and precomputed per-country/per-year totals
+def load_population():
+    global country_names, country_index, code_index, population_matrix, country_totals, year_totals, prefix_sums
+
+    require_ingested('population')
+    arrays, meta = load_arrays(POPULATION_ARRAYS, POPULATION_FILE)
+    if arrays is None:
+        with metrics.timer('parse'):
+            build_population_arrays()
+        arrays, meta = load_arrays(POPULATION_ARRAYS, POPULATION_FILE)
+
+    names, codes = {}, {}
+    for row, (name, code) in enumerate(zip(meta["country_names"], meta["country_codes"])):
+        names.setdefault(name.lower(), row)
+        codes.setdefault(code.lower(), row)
+
+    prefix_sums = arrays["prefix_sums"]
+    country_totals = arrays["country_totals"]
+    year_totals = arrays["year_totals"]
+    population_matrix = arrays["population_matrix"]
+    country_index, code_index = names, codes
+    country_names = meta["country_names"]
+
+start_loading = install_readiness(app, load_population)
+
+# Row of a country given its name or its Country Code, or None
+def find_country(country):
+    key = country.lower()
+    row = country_index.get(key)
+    return row if row is not None else code_index.get(key)
+
+# Lookups are answered inline on the request thread from the read-only arrays above;
+# the executor is only used to split genuinely large bulk queries into parallel slices
+bulk_workers = 4
+executor = ThreadPoolExecutor(max_workers=bulk_workers)
+BULK_PARALLEL_CELLS = 200000
 
 # Function to get population for a specific year
 def get_population_data(country, year):
     year = str(year)
-    result = df[df['Country Name'].str.lower() == country.lower()][['Country Name', year]]
-    if not result.empty:
-        return {"Country": country, "Year": year, "Population": result[year].values[0]}
+    row = find_country(country)
+    col = year_index.get(year)
+    if row is not None and col is not None:
+        return {"Country": country, "Year": year, "Population": float(population_matrix[row, col])}
     return {"error": "Country or Year not found"}
 
 # Function to get cumulative population for a specific country
 def get_cumulative_country_data(country):
-    result = df[df['Country Name'].str.lower() == country.lower()]
-    if not result.empty:
-        population_sum = result.iloc[:, 2:].sum(axis=1).values[0]
+    row = find_country(country)
+    if row is not None:
+        population_sum = float(country_totals[row])
         return {"Country": country, "Cumulative Population": population_sum}
     return {"error": "Country not found"}
 
 # Function to get cumulative population for a specific year
 def get_cumulative_year_data(year):
     year = str(year)
-    if year in df.columns:
-        population_sum = df[year].sum()
+    if year in year_index:
+        population_sum = float(year_totals[year_index[year]])
         return {"Year": year, "Cumulative Population": population_sum}
     return {"error": "Year not found"}
 
+def json_number(value):
+    value = float(value)
+    return None if np.isnan(value) else value
+
+# Function to get population over an inclusive range of years
+def get_range_data(country, start_year, end_year):
+    row = find_country(country)
+    start, end = year_index.get(str(start_year)), year_index.get(str(end_year))
+    if row is None or start is None or end is None or start > end:
+        return {"error": "Country or Year range not found"}
+    return {"Country": country, "Start Year": str(start_year), "End Year": str(end_year),
+            "Cumulative Population": float(prefix_sums[row, end + 1] - prefix_sums[row, start])}
+
+# Function to get total and compound annual growth between two years
+def get_growth_data(country, start_year, end_year):
+    row = find_country(country)
+    start, end = year_index.get(str(start_year)), year_index.get(str(end_year))
+    if row is None or start is None or end is None or start > end:
+        return {"error": "Country or Year range not found"}
+
+    start_population, end_population = population_matrix[row, start], population_matrix[row, end]
+    growth = annual_growth = None
+    if start_population > 0 and not np.isnan(end_population):
+        growth = float(end_population / start_population - 1)
+        if end > start:
+            annual_growth = float((end_population / start_population) ** (1 / (end - start)) - 1)
+    return {"Country": country, "Start Year": str(start_year), "End Year": str(end_year),
+            "Start Population": json_number(start_population), "End Population": json_number(end_population),
+            "Growth Rate": growth, "Annual Growth Rate": annual_growth}
+
+# Function for many countries at once: populations for a list of years (one gather over
+# the matrix) and/or the total over a year range (one gather over the prefix sums)
+def get_bulk_data(countries, years=None, start_year=None, end_year=None):
+    rows = [find_country(country) for country in countries]
+    found = [country for country, row in zip(countries, rows) if row is not None]
+    row_array = np.array([row for row in rows if row is not None], dtype=np.int64)
+    result = {"not_found": [country for country, row in zip(countries, rows) if row is None]}
+
+    if years:
+        cols = [year_index.get(str(year)) for year in years]
+        if any(col is None for col in cols):
+            return {"error": "Year not found"}
+        values = population_matrix[np.ix_(row_array, np.array(cols, dtype=np.int64))]
+        result["populations"] = {
+            country: {str(year): json_number(value) for year, value in zip(years, row_values)}
+            for country, row_values in zip(found, values)
+        }
+
+    if start_year is not None or end_year is not None:
+        start, end = year_index.get(str(start_year)), year_index.get(str(end_year))
+        if start is None or end is None or start > end:
+            return {"error": "Year range not found"}
+        totals = prefix_sums[row_array, end + 1] - prefix_sums[row_array, start]
+        result["cumulative_population"] = {country: float(total) for country, total in zip(found, totals)}
+
+    return result
+
+# Large bulk queries: slices of the country list are gathered concurrently (NumPy releases
+# the GIL while copying) and the partial results merged in order
+def get_bulk_data_parallel(countries, years=None, start_year=None, end_year=None):
+    slice_size = -(-len(countries) // bulk_workers)
+    futures = [
+        executor.submit(get_bulk_data, countries[i:i + slice_size], years, start_year, end_year)
+        for i in range(0, len(countries), slice_size)
+    ]
+    result = {"not_found": []}
+    for future in futures:
+        part = future.result()
+        if "error" in part:
+            return part
+        result["not_found"].extend(part["not_found"])
+        for key in ("populations", "cumulative_population"):
+            if key in part:
+                result.setdefault(key, {}).update(part[key])
+    return result
+
 # Route to get population data for a specific year and country
 @app.route('/population/<country>/<year>', methods=['GET'])
 def get_population(country, year):
     start_time = time.time()  # Start the timer
-    future = executor.submit(get_population_data, country, year)
-    result = future.result()
+    with metrics.timer('lookup'):
+        result = get_population_data(country, year)
     end_time = time.time()  # End the timer
     processing_time_ms = (end_time - start_time)
     return jsonify({"result": result, "processing_time": processing_time_ms})
@@ -49,8 +200,8 @@ def get_population(country, year):
 @app.route('/population/cumulative/country/<country>', methods=['GET'])
 def get_cumulative_population_country(country):
     start_time = time.time()  # Start the timer
-    future = executor.submit(get_cumulative_country_data, country)
-    result = future.result()
+    with metrics.timer('lookup'):
+        result = get_cumulative_country_data(country)
     end_time = time.time()  # End the timer
     processing_time_ms = (end_time - start_time)
     return jsonify({"result": result, "processing_time": processing_time_ms})
@@ -59,12 +210,76 @@ def get_cumulative_population_country(country):
 @app.route('/population/cumulative/year/<year>', methods=['GET'])
 def get_cumulative_population_year(year):
     start_time = time.time()  # Start the timer
-    future = executor.submit(get_cumulative_year_data, year)
-    result = future.result()
+    with metrics.timer('lookup'):
+        result = get_cumulative_year_data(year)
     end_time = time.time()  # End the timer
     processing_time_ms = (end_time - start_time)
     return jsonify({"result": result, "processing_time": processing_time_ms})
 
+# Route to get population for a country over an inclusive range of years
+@app.route('/population/range/<country>/<start_year>/<end_year>', methods=['GET'])
+def get_population_range(country, start_year, end_year):
+    start_time = time.time()  # Start the timer
+    with metrics.timer('lookup'):
+        result = get_range_data(country, start_year, end_year)
+    end_time = time.time()  # End the timer
+    processing_time_ms = (end_time - start_time)
+    return jsonify({"result": result, "processing_time": processing_time_ms})
+
+# Route to get population growth for a country between two years
+@app.route('/population/growth/<country>/<start_year>/<end_year>', methods=['GET'])
+def get_population_growth(country, start_year, end_year):
+    start_time = time.time()  # Start the timer
+    with metrics.timer('lookup'):
+        result = get_growth_data(country, start_year, end_year)
+    end_time = time.time()  # End the timer
+    processing_time_ms = (end_time - start_time)
+    return jsonify({"result": result, "processing_time": processing_time_ms})
+
+# Bulk answers are cached; single lookups are cheaper to recompute than to cache
+result_cache = ResultCache()
+add_cache_stats_route(app, result_cache)
+
+# Route for many countries x many years in one call. Takes repeated country/year query
+# parameters (plus optional start_year/end_year), or the same keys as a JSON body:
+# {"countries": [...], "years": [...], "start_year": ..., "end_year": ...}
+@app.route('/population/bulk', methods=['GET', 'POST'])
+def get_population_bulk():
+    start_time = time.time()  # Start the timer
+    if request.method == 'POST':
+        body = request.get_json(silent=True) or {}
+        if not isinstance(body, dict):
+            return jsonify({"error": "the request body must be a JSON object"}), 400
+        countries, years = body.get('countries'), body.get('years')
+        start_year, end_year = body.get('start_year'), body.get('end_year')
+    else:
+        countries, years = request.args.getlist('country'), request.args.getlist('year')
+        start_year, end_year = request.args.get('start_year'), request.args.get('end_year')
+
+    if not countries or not isinstance(countries, list) or not all(isinstance(c, str) for c in countries):
+        return jsonify({"error": "a non-empty list of countries is required"}), 400
+    if not years and start_year is None and end_year is None:
+        return jsonify({"error": "years or start_year/end_year are required"}), 400
+    if years and not isinstance(years, list):
+        return jsonify({"error": "years must be a list"}), 400
+
+    def build():
+        cells = len(countries) * max(len(years or []), 1)
+        with metrics.timer('lookup'):
+            if cells >= BULK_PARALLEL_CELLS:
+                result = get_bulk_data_parallel(countries, years, start_year, end_year)
+            else:
+                result = get_bulk_data(countries, years, start_year, end_year)
+        metrics.processed('lookup', rows=cells)
+        end_time = time.time()  # End the timer
+        processing_time_ms = (end_time - start_time)
+        with metrics.timer('serialize'):
+            return jsonify({"result": result, "processing_time": processing_time_ms})
+
+    key = ('bulk', json.dumps([countries, years, start_year, end_year]))
+    return cached_response(result_cache, key, [POPULATION_FILE], build)
+
 # Run the app
 if __name__ == '__main__':
+    start_loading()
     app.run(debug=True, threaded=True)
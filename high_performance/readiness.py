@@ -0,0 +1,51 @@
+import threading
+import time
+from flask import jsonify, request
+
+# Seconds a request waits for the background load before answering 503
+READY_TIMEOUT = 30
+
+# Load a service's data in a background thread and gate requests (other than /ready and
+# /metrics) on it. Adds a /ready endpoint (200 once loaded, 503 while loading, 500 if
+# loading failed) and returns the function that starts loading; the first request also
+# starts it, so the data is loaded lazily under a WSGI server that never runs the
+# module's __main__ block.
+def install_readiness(app, load, timeout=READY_TIMEOUT):
+    state = {"started": False, "error": None, "boot_time": time.time(), "ready_time": None}
+    ready = threading.Event()
+    lock = threading.Lock()
+
+    def run():
+        try:
+            load()
+        except Exception as e:
+            state["error"] = str(e)
+        state["ready_time"] = time.time()
+        ready.set()
+
+    def start_loading():
+        with lock:
+            if not state["started"]:
+                state["started"] = True
+                threading.Thread(target=run, daemon=True).start()
+
+    @app.before_request
+    def wait_for_data():
+        start_loading()
+        if request.endpoint in ('ready', 'metrics'):
+            return None
+        if not ready.wait(timeout):
+            return jsonify({"error": "service is still loading its data"}), 503
+        if state["error"]:
+            return jsonify({"error": f"service failed to load its data: {state['error']}"}), 500
+        return None
+
+    @app.route('/ready', methods=['GET'], endpoint='ready')
+    def ready_check():
+        if not ready.is_set():
+            return jsonify({"status": "loading"}), 503
+        if state["error"]:
+            return jsonify({"status": "failed", "error": state["error"]}), 500
+        return jsonify({"status": "ready", "boot_to_ready_seconds": state["ready_time"] - state["boot_time"]})
+
+    return start_loading
@@ -0,0 +1,111 @@
+import os
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+from flask import Response, jsonify, make_response
+
+# Response cache shared by the request threads of one service. Entries are evicted least
+# recently used first once either bound is exceeded, keys carry the size and mtime of the
+# files the answer was computed from (so a changed file is simply a different key), and
+# identical requests that arrive while one is being computed wait for that computation
+# instead of starting their own.
+
+RESULT_CACHE_MB = int(os.environ.get('RESULT_CACHE_MB', 64))
+RESULT_CACHE_ENTRIES = 1024
+
+def source_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return path, stat.st_size, stat.st_mtime_ns
+
+class ResultCache:
+    def __init__(self, max_bytes=RESULT_CACHE_MB * 2**20, max_entries=RESULT_CACHE_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.in_flight = {}
+        self.bytes = 0
+        self.counters = Counter(hits=0, misses=0, coalesced=0, evictions=0)
+        self.lock = threading.Lock()
+
+    # Cached value for key, or compute() run once however many threads ask concurrently.
+    # Values failing `cacheable` are handed to the waiting threads but not kept.
+    def get_or_compute(self, key, compute, size_of=len, cacheable=lambda value: True):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.counters["hits"] += 1
+                return self.entries[key][0]
+            future = self.in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self.in_flight[key] = Future()
+                self.counters["misses"] += 1
+            else:
+                self.counters["coalesced"] += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self.lock:
+                del self.in_flight[key]
+            future.set_exception(e)
+            raise
+
+        with self.lock:
+            del self.in_flight[key]
+            if cacheable(value):
+                self.store(key, value, size_of(value))
+        future.set_result(value)
+        return value
+
+    # Caller holds the lock
+    def store(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (value, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes or len(self.entries) > self.max_entries:
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.bytes -= evicted_size
+            self.counters["evictions"] += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.counters["hits"] + self.counters["misses"] + self.counters["coalesced"]
+            return {
+                **self.counters,
+                "hit_ratio": (self.counters["hits"] + self.counters["coalesced"]) / lookups if lookups else 0.0,
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "in_flight": len(self.in_flight),
+            }
+
+# Serve a route's response through the cache. `build` returns anything a Flask view may
+# return; the rendered body is what gets stored, and only 200 responses are kept.
+def cached_response(cache, key, sources, build):
+    key = (key, tuple(source_signature(path) for path in sources))
+
+    def render():
+        response = make_response(build())
+        return response.get_data(), response.status_code, response.mimetype
+
+    body, status, mimetype = cache.get_or_compute(
+        key, render, size_of=lambda value: len(value[0]), cacheable=lambda value: value[1] == 200)
+    return Response(body, status=status, mimetype=mimetype)
+
+def add_cache_stats_route(app, cache):
+    @app.route('/cache/stats', methods=['GET'], endpoint='cache_stats')
+    def cache_stats():
+        return jsonify(cache.stats())
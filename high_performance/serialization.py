@@ -0,0 +1,87 @@
+import json
+import numpy as np
+import pandas as pd
+from flask import Response, jsonify, request
+
+# Response encodings selectable per request with ?format=:
+#   records  one JSON object per row (the default, unchanged)
+#   columns  one JSON array per column, encoded straight from the NumPy arrays
+#   arrow    an Arrow IPC stream (also chosen by an Accept header of ARROW_MIMETYPE)
+# orjson and pyarrow are optional: without orjson the columnar JSON falls back to a
+# NumPy-aware json encoder, and without pyarrow format=arrow answers 406.
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+FORMATS = ('records', 'columns', 'arrow')
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+
+class NumpyJSONEncoder(json.JSONEncoder):
+    def default(self, o):
+        if isinstance(o, np.ndarray):
+            if o.dtype.kind == 'f':
+                return [None if np.isnan(value) else value for value in o.tolist()]
+            return o.tolist()
+        if isinstance(o, np.integer):
+            return int(o)
+        if isinstance(o, np.floating):
+            return None if np.isnan(o) else float(o)
+        if isinstance(o, np.bool_):
+            return bool(o)
+        return super().default(o)
+
+def dumps(payload):
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, cls=NumpyJSONEncoder).encode('utf-8')
+
+def json_response(payload, status=200):
+    return Response(dumps(payload), status=status, mimetype='application/json')
+
+# The requested format, or None if it is not one of FORMATS
+def requested_format():
+    fmt = request.args.get('format')
+    if fmt is None:
+        return 'arrow' if request.accept_mimetypes.best == ARROW_MIMETYPE else 'records'
+    return fmt if fmt in FORMATS else None
+
+def format_error(fmt):
+    if fmt is None:
+        return jsonify({"error": f"format must be one of {list(FORMATS)}"}), 400
+    if fmt == 'arrow' and pa is None:
+        return jsonify({"error": "format=arrow needs pyarrow installed"}), 406
+    return None
+
+# Numeric columns stay NumPy arrays (NaN becomes null); everything else becomes a list
+# with missing values as None
+def column_values(series):
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in 'biuf':
+        return np.ascontiguousarray(series.to_numpy())
+    if pd.api.types.is_datetime64_any_dtype(series):
+        series = series.dt.strftime('%Y-%m-%dT%H:%M:%S')
+    return series.astype(object).where(series.notna(), None).tolist()
+
+def frame_columns(df):
+    return {str(col): column_values(df[col]) for col in df.columns}
+
+def arrow_response(df):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Response(sink.getvalue().to_pybytes(), mimetype=ARROW_MIMETYPE)
+
+# A DataFrame in the requested format; `records` builds the default response
+def frame_response(df, fmt, records):
+    if fmt == 'arrow':
+        return arrow_response(df)
+    if fmt == 'columns':
+        return json_response(frame_columns(df))
+    return records()
@@ -0,0 +1,73 @@
+import json
+import os
+import shutil
+import numpy as np
+
+# Read-only datasets materialized once as a directory of .npy files plus meta.json.
+# Every worker process attaches with np.load(mmap_mode='r'), so the pages are shared
+# through the OS page cache instead of each worker holding its own copy.
+
+def file_signature(file_path):
+    stat = os.stat(file_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+# A fresh, empty build directory private to this process
+def make_tmp_dir(directory):
+    tmp_path = f"{directory}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    return tmp_path
+
+def read_meta(directory):
+    try:
+        with open(os.path.join(directory, 'meta.json')) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+# Move a directory built with make_tmp_dir into place. When several workers race to
+# build the same directory the first to publish wins and the others drop their copy;
+# an existing directory is only replaced when its meta.json differs (it is stale).
+def publish_dir(tmp_path, directory):
+    if os.path.exists(directory) and read_meta(directory) == read_meta(tmp_path):
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        return
+    if os.path.exists(directory):
+        old_path = f"{directory}.{os.getpid()}.old"
+        try:
+            os.rename(directory, old_path)
+            shutil.rmtree(old_path, ignore_errors=True)
+        except OSError:
+            pass
+    try:
+        os.rename(tmp_path, directory)
+    except OSError:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+# Write the arrays under a private temporary name, then move it into place
+def save_arrays(directory, arrays, meta):
+    tmp_path = make_tmp_dir(directory)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_path, name + '.npy'), np.ascontiguousarray(array))
+    with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    publish_dir(tmp_path, directory)
+
+# Memory-map every array in the directory; returns (arrays, meta), or (None, None) when
+# the directory is missing (or was replaced while reading it) or was built from a
+# different version of `source_file`
+def load_arrays(directory, source_file=None):
+    meta = read_meta(directory)
+    if meta is None:
+        return None, None
+    if source_file is not None and meta.get("source_signature") != file_signature(source_file):
+        return None, None
+
+    arrays = {}
+    try:
+        for name in os.listdir(directory):
+            if name.endswith('.npy'):
+                arrays[name[:-len('.npy')]] = np.load(os.path.join(directory, name), mmap_mode='r')
+    except FileNotFoundError:
+        return None, None
+    return arrays, meta
@@ -24,21 +24,21 @@ arr_normal = arr.copy()
 arr_numba = arr.copy()
 
 # Measure time for normal Python loop
-start_time = time.time()
+start_time = time.perf_counter()
 normal_loop(arr_normal)
-end_time = time.time()
+end_time = time.perf_counter()
 normal_time = (end_time - start_time) * 1000  # Convert to milliseconds
 
-# # Run the Numba function once to compile it (ignore this time)
-# numba_loop(arr_numba)
+# Run the Numba function once to compile it, so compilation is not timed
+numba_loop(arr_numba)
 
-# # Copy the array again for a fresh run after compilation
-# arr_numba = arr.copy()
+# Copy the array again for a fresh run after compilation
+arr_numba = arr.copy()
 
 # Measure time for Numba-optimized loop
-start_time = time.time()
+start_time = time.perf_counter()
 numba_loop(arr_numba)
-end_time = time.time()
+end_time = time.perf_counter()
 numba_time = (end_time - start_time) * 1000  # Convert to milliseconds
 
 # Display results
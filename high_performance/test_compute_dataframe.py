@@ -0,0 +1,72 @@
+import importlib.util
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# Equivalence checks: the parallel compute_dataframe kernel must give the same
+# summaries as the first_iteration iterrows implementation
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+first_iteration = load_module('first_iteration_airnow', os.path.join(HERE, '..', 'first_iteration', 'airnow_fires.py'))
+
+# Imported under its real name: Numba's on-disk cache records the module the kernel was
+# compiled in, and a cache entry written from an unregistered module cannot be loaded
+# by the service afterwards
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+import airnow_fires as high_performance
+
+def make_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    aqi = rng.integers(0, 300, rows).astype(float)
+    aqi[rng.random(rows) < 0.1] = -999
+    aqi[rng.random(rows) < 0.05] = np.nan
+    site_names = np.array([f"Site {i}" for i in range(37)])[rng.integers(0, 37, rows)]
+    site_agencies = np.array(["EPA", "CARB", "USFS", "nan"])[rng.integers(0, 4, rows)]
+    parameters = np.array(["PM2.5", "OZONE", "PM10"])[rng.integers(0, 3, rows)]
+    return pd.DataFrame({
+        'AQI': aqi,
+        'Site-name': site_names,
+        'Site-agency': site_agencies,
+        'Parameter': parameters
+    })
+
+def assert_equivalent(result_df):
+    expected = first_iteration.summarize_dataframe(result_df)
+    actual = high_performance.summarize_dataframe(result_df)
+
+    assert actual["aqi_count"] == expected["aqi_count"]
+    assert np.isclose(actual["aqi_sum"], expected["aqi_sum"])
+    assert actual["site_name_frequency"] == expected["site_name_frequency"]
+    assert actual["site_agency_frequency"] == expected["site_agency_frequency"]
+    assert actual["parameter_frequency"] == expected["parameter_frequency"]
+
+def test_matches_iterrows():
+    assert_equivalent(make_frame(5000))
+
+def test_fewer_rows_than_chunks():
+    assert_equivalent(make_frame(high_performance.KERNEL_CHUNKS // 2, seed=1))
+
+def test_empty_frame():
+    assert_equivalent(make_frame(0))
+
+def test_deterministic():
+    result_df = make_frame(20000, seed=2)
+    first = high_performance.summarize_dataframe(result_df)
+    for _ in range(5):
+        assert high_performance.summarize_dataframe(result_df) == first
+
+if __name__ == '__main__':
+    test_matches_iterrows()
+    test_fewer_rows_than_chunks()
+    test_empty_frame()
+    test_deterministic()
+    print("compute_dataframe matches the iterrows implementation")